@@ -11,13 +11,27 @@ a scoped database session to API request handlers.
 Key features:
 - Uses PostgreSQL (default connection string points to the `db` service in Docker).
 - Connection is robust to transient DB restarts (`pool_pre_ping=True`).
+- Pool size/overflow/timeout/recycle are tunable via `DB_POOL_*` / `DB_MAX_OVERFLOW` env vars
+  (server databases only; SQLite keeps its default pool).
+- On Postgres, every connection gets a `statement_timeout` and an
+  `idle_in_transaction_session_timeout` so a runaway query cannot starve the pool.
+- On Postgres (psycopg2), multi-row writes are batched: INSERTs go out as
+  multi-VALUES statements and other executemany calls through `execute_batch`.
 - Compatible with SQLAlchemy 2.0 (`future=True`).
 - Provides a clean session management pattern for FastAPI routes.
+- One session per HTTP request: `SessionMiddleware` opens it and stores it in a
+  ContextVar, so every `get_db` dependency in that request shares it.
 """
 
 import os
+from contextvars import ContextVar
+from typing import Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
 
 # -----------------------------------------------------------------------------
 # Database URL configuration
@@ -28,12 +42,139 @@ DATABASE_URL = os.getenv(
     "postgresql+psycopg2://postgres:postgres@db:5432/healthdb",
 )
 
+# -----------------------------------------------------------------------------
+# Connection pool sizing
+# -----------------------------------------------------------------------------
+# Sync endpoints run in uvicorn's threadpool, so the pool should track the number
+# of requests that can hit the DB at once (roughly `--workers` x threadpool size
+# per process). SQLAlchemy's default (5 + 10 overflow) makes bursts of /health
+# traffic queue for a connection ("QueuePool limit reached").
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Fail fast instead of piling up requests when the pool is exhausted
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Recycle connections before server-side idle timeouts can kill them
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# -----------------------------------------------------------------------------
+# Server-side guards (Postgres only)
+# -----------------------------------------------------------------------------
+# Health queries return a handful of scalars; anything running longer is a stuck
+# query that would otherwise hold a pooled connection. Both timeouts are set per
+# connection at connect time (0 disables them, e.g. for bulk seeding).
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "2000"))
+DB_IDLE_TX_TIMEOUT_MS = int(os.getenv("DB_IDLE_TX_TIMEOUT_MS", "5000"))
+
+_backend = make_url(DATABASE_URL).get_backend_name()
+
+# Pool sizing applies to server databases (QueuePool). SQLite picks its own pool
+# (SingletonThreadPool for `sqlite://`, which rejects overflow/timeout settings).
+pool_kwargs = {}
+if _backend != "sqlite":
+    pool_kwargs = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+connect_args = {}
+dialect_kwargs = {}
+if _backend == "postgresql":
+    # INSERT executemany (e.g. ORM `add_all` needing generated ids) already becomes
+    # a few `INSERT ... VALUES (...), (...) RETURNING id` pages in SQLAlchemy 2.0;
+    # "values_plus_batch" also batches UPDATE/DELETE executemany via execute_batch
+    # instead of one round trip per row.
+    dialect_kwargs = {"executemany_mode": "values_plus_batch"}
+    connect_args = {
+        "options": (
+            f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS} "
+            f"-c idle_in_transaction_session_timeout={DB_IDLE_TX_TIMEOUT_MS}"
+        ),
+        "application_name": os.getenv("DB_APPLICATION_NAME", "health_api"),
+    }
+
 # Robust to brief DB restarts; SQLAlchemy v2-compatible
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    connect_args=connect_args,
+    future=True,
+    **pool_kwargs,
+    **dialect_kwargs,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
 Base = declarative_base()
 
+# Columns added to existing models after their table first shipped. `create_all`
+# never alters an existing table, so deployed databases get them here (Postgres
+# only; `IF NOT EXISTS` makes each statement idempotent).
+ADDED_COLUMNS_DDL = (
+    "ALTER TABLE customers ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE customer_health_stats ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0",
+)
+
+
+def create_missing_columns() -> None:
+    """
+    Add model columns that an existing Postgres table does not have yet.
+
+    Adding a column with a constant default is a metadata-only change on
+    Postgres 11+, so this is cheap and safe to run on every startup. Other
+    backends (SQLite in tests) always get their tables from a fresh `create_all`.
+    """
+    if _backend != "postgresql":
+        return
+    with engine.begin() as conn:
+        for ddl in ADDED_COLUMNS_DDL:
+            conn.exec_driver_sql(ddl)
+
+
+def create_missing_indexes() -> None:
+    """
+    Create any model-declared index that does not exist yet.
+
+    `create_all` only builds indexes together with a brand-new table, so indexes
+    added to an existing model would never reach a deployed database. Each index is
+    created with `checkfirst=True`, which makes this idempotent and safe on startup.
+
+    Building an index over an existing large table outlasts the API's per-statement
+    guard, so on Postgres the DDL runs in one transaction with `SET LOCAL
+    statement_timeout = 0` (scoped to that transaction; the pooled connection keeps
+    its normal timeout afterwards).
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+# Session shared by everything that runs inside the current request
+_request_session: ContextVar[Optional[Session]] = ContextVar("request_session", default=None)
+
+
+class SessionMiddleware(BaseHTTPMiddleware):
+    """
+    Open one SQLAlchemy session per request and expose it through `get_db`.
+
+    Without this, each dependency (or middleware) that needs the DB would check out
+    its own pooled connection, paying a `pool_pre_ping` round-trip every time.
+    The session is lazy: requests that never touch the DB never check out a connection.
+    """
+
+    async def dispatch(self, request, call_next):
+        session = SessionLocal()
+        token = _request_session.set(session)
+        try:
+            return await call_next(request)
+        finally:
+            _request_session.reset(token)
+            # Returning the connection to the pool does I/O; keep it off the event loop
+            await run_in_threadpool(session.close)
+
 
 # FastAPI dependency
 def get_db():
@@ -49,9 +190,15 @@ def get_db():
         Session: A SQLAlchemy session connected to the configured database.
 
     Ensures:
-        - A session is opened when the request starts.
-        - The session is closed automatically when the request ends.
+        - Inside a request, the session opened by `SessionMiddleware` is reused
+          (and closed by the middleware when the request ends).
+        - Outside the middleware, a private session is opened and closed here.
     """
+    session = _request_session.get()
+    if session is not None:
+        yield session
+        return
+
     db = SessionLocal()
     try:
         yield db
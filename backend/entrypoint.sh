@@ -30,5 +30,9 @@ echo "Creating tables (if needed) and seeding (if empty)..."
 # The seed script will create tables and skip reseeding if data already exists.
 python db/seed.py --customers 80
 
+echo "Materializing customer health..."
+# Also worth scheduling (e.g. nightly) so rolling windows move for idle customers.
+python db/refresh_health.py
+
 echo "Starting API..."
 exec uvicorn backend.main:app --host 0.0.0.0 --port 8000
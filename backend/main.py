@@ -13,42 +13,49 @@ What this service does
 Design decisions (high level)
 -----------------------------
 - Tables are created on startup if they don't exist (idempotent, safe for local dev).
-- Health score is NOT stored in the DB; it's computed on demand from recent activity:
+- Health score is NOT stored in the DB; it's computed on demand from recent activity
+  (the underlying window counts are materialized per customer and refreshed on ingest):
     * Login frequency      -> 30d window (recent engagement)
     * Feature adoption     -> 90d window (breadth over time)
     * Support ticket load  -> 90d window (quarterly stability)
     * Invoice timeliness   -> last few invoices; **neutral (50)** if no billing history
     * API usage trend      -> last 30d vs previous 30d (momentum)
+- Computed breakdowns are cached in-process for a short TTL, keyed by a per-customer
+  data version that ingest bumps (so every worker sees writes).
 - Invoice timeliness uses a *counts-based* scorer so we can distinguish:
     * 0/0 invoices (no history)        -> neutral (50), not penalized
     * 0/3 invoices (all late)          -> 0 (bad)
 - Endpoints are intentionally simple and documented for reviewer visibility.
+- The HTML pages (`/app`, `/api/dashboard`) are served by the nginx frontend
+  container, not by this app.
 """
 
-from datetime import datetime, timedelta
-from typing import List
+import os
 from datetime import datetime
-from fastapi import HTTPException
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session
-
-from .db import Base, engine, get_db
-from .models import Customer, Event, Invoice, SupportTicket, FeatureUsage
+from typing import Dict, List
+
+from fastapi import FastAPI, Depends, HTTPException, Query
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session, load_only
+
+from .db import Base, engine, get_db, create_missing_columns, create_missing_indexes, SessionMiddleware
+from .models import Customer, CustomerHealthStats, Event, Invoice, SupportTicket, FeatureUsage, utcnow
 from .schemas import CustomerOut, HealthOut, EventIn
 from .services.health import (
     WEIGHTS,
-    score_login_frequency,
-    score_feature_adoption,
-    score_support_load,
-    score_invoice_timeliness_counts,
-    score_api_trend,
-    weighted_score,
-    TOTAL_KEY_FEATURES,
+    weighted_scores_batch,
+    score_factor_matrix,
+    FACTOR_KEYS,
+)
+from .services.signals import (
+    FACTOR_INPUT_COLUMNS,
+    fetch_signals_soa,
+    load_health,
+    refresh_health_stats,
+    stats_are_fresh,
+    stats_factors,
 )
+from .services.cache import HealthCache
 
 # You can customize title/description to look more professional in Swagger/ReDoc
 app = FastAPI(
@@ -56,10 +63,12 @@ app = FastAPI(
     description="Compute customer health from usage, support, billing, and API trends.",
     version="0.1.0",
 )
-# # Mount the whole frontend folder (so assets work if you add any later)
-# app.mount("/static", StaticFiles(directory="frontend"), name="static")
-# HOME = Path("frontend/home.html").resolve()
-# DASH = Path("frontend/dashboard.html").resolve()
+# One DB session per request, shared by every `get_db` dependency
+app.add_middleware(SessionMiddleware)
+
+# Health responses are reused for up to HEALTH_CACHE_TTL seconds, or until the
+# customer's data_version changes (see services.cache)
+health_cache = HealthCache(ttl_seconds=int(os.getenv("HEALTH_CACHE_TTL", "60")))
 
 @app.on_event("startup")
 def startup_event() -> None:
@@ -69,14 +78,28 @@ def startup_event() -> None:
     We create tables if they do not exist yet. This is idempotent (safe to call
     repeatedly). Seeding is *not* performed here—sample data is generated once
     via the separate `db/seed.py` script so the dataset remains stable.
+    Columns and indexes added to existing tables are created here as well.
     """
     Base.metadata.create_all(bind=engine)
+    create_missing_columns()
+    create_missing_indexes()
+
+# Statements are built once at import and executed with bound parameters, so
+# requests skip expression construction and go straight to the compiled cache.
+LIST_CUSTOMERS_STMT = select(Customer).options(
+    load_only(Customer.id, Customer.name, Customer.segment, Customer.health_score)
+)
+CUSTOMER_WITH_STATS_STMT = (
+    select(Customer, CustomerHealthStats)
+    .outerjoin(CustomerHealthStats, CustomerHealthStats.customer_id == Customer.id)
+    .where(Customer.id == bindparam("cid"))
+)
+CUSTOMERS_WITH_STATS_STMT = (
+    select(Customer.id, Customer.name, Customer.data_version, CustomerHealthStats)
+    .outerjoin(CustomerHealthStats, CustomerHealthStats.customer_id == Customer.id)
+    .where(Customer.id.in_(bindparam("ids", expanding=True)))
+)
 
-# @app.get("/app")          # homepage
-# def home_page(): return FileResponse(HOME)
-#
-# @app.get("/api/dashboard")# dashboard
-# def dashboard_page(): return FileResponse(DASH)
 
 @app.get("/api/customers", response_model=List[CustomerOut], tags=["Customers"])
 def list_customers(db: Session = Depends(get_db)) -> List[CustomerOut]:
@@ -85,8 +108,12 @@ def list_customers(db: Session = Depends(get_db)) -> List[CustomerOut]:
     Returns the raw database fields for customers. Note that `health_score` in the
     table is a placeholder; the *real* health is a derived value computed by
     `/api/customers/{id}/health` from recent activity.
+
+    Only the columns in `CustomerOut` are loaded; relationships are never touched
+    (they are `raise_on_sql`, so adding a derived field that reads one without an
+    explicit `selectinload` fails loudly instead of issuing one query per row).
     """
-    return db.query(Customer).all()
+    return db.execute(LIST_CUSTOMERS_STMT).scalars().all()
 
 
 @app.get("/api/customers/{customer_id}/health", response_model=HealthOut, tags=["Health"])
@@ -101,101 +128,31 @@ def customer_health(customer_id: int, db: Session = Depends(get_db)) -> HealthOu
     - invoiceTimeliness (on-time % over recent invoices; **neutral if none**)
     - apiTrend (this 30d vs previous 30d; 50 = no change)
 
+    Responses are cached per customer for a short time bucket, keyed by the
+    customer's `data_version`, which every ingested event bumps.
+
     Returns:
         HealthOut: { id, name, factors{...}, weights{...}, healthScore }
     """
-    customer = db.get(Customer, customer_id)
-    if not customer:
+    # Customer (with its data_version) and materialized counts in one primary-key round-trip
+    row = db.execute(CUSTOMER_WITH_STATS_STMT, {"cid": customer_id}).one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Customer not found")
+    customer, stats = row
+    version = customer.data_version
 
-    # Define sliding windows used across factors
-    now = datetime.utcnow()
-    d30 = now - timedelta(days=30)
-    d60 = now - timedelta(days=60)
-    d90 = now - timedelta(days=90)
-
-    # --- Login frequency (last 30d) ---
-    # Frequent logins indicate engagement. We normalize against a target in services.health.
-    logins_30d = db.execute(
-        select(func.count()).select_from(Event)
-        .where(Event.customer_id == customer_id)
-        .where(Event.type == "login")
-        .where(Event.timestamp >= d30)
-    ).scalar() or 0
-    login_s = score_login_frequency(logins_30d)
-
-    # --- Feature adoption (distinct features used last 90d) ---
-    # Breadth over time: the more "key features" a customer uses, the stickier they are.
-    distinct_features = db.execute(
-        select(func.count(func.distinct(FeatureUsage.feature_name)))
-        .where(FeatureUsage.customer_id == customer_id)
-        .where(FeatureUsage.used_at >= d90)
-    ).scalar() or 0
-    feature_s = score_feature_adoption(distinct_features, TOTAL_KEY_FEATURES)
-
-    # --- Support load (tickets opened last 90d) ---
-    # Fewer tickets imply less friction; 90d window smooths spikes.
-    tickets_90d = db.execute(
-        select(func.count()).select_from(SupportTicket)
-        .where(SupportTicket.customer_id == customer_id)
-        .where(SupportTicket.created_at >= d90)
-    ).scalar() or 0
-    support_s = score_support_load(tickets_90d)
-
-    # --- Invoice timeliness (counts, not ratio) ---
-    # Distinguish "no history" from "bad history" using counts:
-    #   * total=0    -> neutral (50) to avoid penalizing new customers
-    #   * on_time/total in (0..1] -> map to 0..100
-    on_time = db.execute(
-        select(func.count()).select_from(Invoice).where(
-            (Invoice.customer_id == customer_id)
-            & (Invoice.paid_date.isnot(None))
-            & (Invoice.paid_date <= Invoice.due_date)
-        )
-    ).scalar() or 0
-    total_invoices = db.execute(
-        select(func.count()).select_from(Invoice)
-        .where(Invoice.customer_id == customer_id)
-    ).scalar() or 0
-    invoice_s = score_invoice_timeliness_counts(
-        on_time_invoices=on_time,
-        total_invoices=total_invoices,
-        neutral_if_no_history=True,  # <— key behavior documented in README
-    )
+    cached = health_cache.get(customer_id, version)
+    if cached is not None:
+        return cached
 
-    # --- API usage trend (30d vs previous 30d) ---
-    # Momentum matters: downtrends (<50) can be early churn signals.
-    api_curr = db.execute(
-        select(func.count()).select_from(Event)
-        .where(Event.customer_id == customer_id)
-        .where(Event.type == "api_call")
-        .where(Event.timestamp >= d30)
-    ).scalar() or 0
-    api_prev = db.execute(
-        select(func.count()).select_from(Event)
-        .where(Event.customer_id == customer_id)
-        .where(Event.type == "api_call")
-        .where(Event.timestamp < d30)
-        .where(Event.timestamp >= d60)
-    ).scalar() or 0
-    api_s = score_api_trend(api_curr, api_prev)
-
-    # Aggregate factors and compute final weighted score
-    factors = {
-        "loginFrequency": login_s,
-        "featureAdoption": feature_s,
-        "supportLoad": support_s,
-        "invoiceTimeliness": invoice_s,
-        "apiTrend": api_s,
-    }
-    final_score = weighted_score(factors)
-
-    customer.health_score = round(final_score, 1)
-    db.add(customer)
-    db.commit()
-    db.refresh(customer)
+    # Materialized factors/score computed from this data_version (and recently)
+    # are used as-is; stale/missing ones are
+    # recomputed from raw activity with one aggregate statement (30d/60d/90d windows)
+    factors, final_score, refreshed = load_health(db, customer_id, version, stats, utcnow())
 
-    return HealthOut(
+    # Build the response before committing: commit expires the instance, and
+    # reading customer.name afterwards would cost another SELECT round-trip.
+    result = HealthOut(
         id=customer.id,
         name=customer.name,
         factors=factors,
@@ -203,6 +160,98 @@ def customer_health(customer_id: int, db: Session = Depends(get_db)) -> HealthOu
         healthScore=final_score,
     )
 
+    # Persist the snapshot only when it moved (skips UPDATE + COMMIT round-trips)
+    stored_score = round(final_score, 1)
+    if customer.health_score != stored_score:
+        customer.health_score = stored_score
+        refreshed = True
+    if refreshed:
+        db.commit()
+
+    health_cache.put(customer_id, version, result)
+    return result
+
+
+# Upper bound on ids per batch request (keeps the IN (...) list and payload modest)
+MAX_BATCH_IDS = 500
+
+
+@app.get("/api/health", response_model=List[HealthOut], tags=["Health"])
+def customers_health_batch(
+    ids: str = Query(..., description="Comma-separated customer ids, e.g. 1,2,3"),
+    db: Session = Depends(get_db),
+) -> List[HealthOut]:
+    """
+    Compute health breakdowns for several customers in one call.
+
+    Dashboards listing N customers would otherwise make N calls to
+    `/api/customers/{id}/health`. Sources match the single-customer endpoint, which
+    shares the same cache entries: a fresh materialized stats row is served as-is,
+    and every other cache miss is served by one grouped aggregate statement
+    (`WHERE customer_id IN (...) GROUP BY customer_id`), scored with the same factor
+    logic and weighted with column-wise NumPy operations (identical to the
+    single-customer score).
+
+    Notes:
+        - Results follow the order of `ids`; duplicates are collapsed and unknown ids skipped.
+        - Fresh results are cached, but neither `customers.health_score` nor the
+          stats rows are written back.
+
+    Raises:
+        HTTPException(400): if `ids` is not a comma-separated list of integers or too long.
+    """
+    try:
+        requested = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if len(requested) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+
+    # Current data versions decide which cached breakdowns and stats rows are still valid
+    customers = db.execute(CUSTOMERS_WITH_STATS_STMT, {"ids": requested}).all() if requested else []
+    now = utcnow()
+
+    results: Dict[int, HealthOut] = {}
+    versions: Dict[int, int] = {}
+    misses = []
+    for cid, name, version, stats in customers:
+        versions[cid] = version
+        cached = health_cache.get(cid, version)
+        if cached is not None:
+            results[cid] = cached
+        elif stats_are_fresh(stats, version, now):
+            result = HealthOut(
+                id=cid,
+                name=name,
+                factors=stats_factors(stats),
+                weights=WEIGHTS,
+                healthScore=stats.health_score,
+            )
+            health_cache.put(cid, version, result)
+            results[cid] = result
+        else:
+            misses.append(cid)
+
+    signals = fetch_signals_soa(db, misses, now)
+    if len(signals["customer_id"]):
+        # Count columns straight into the factor matrix, then weight its columns
+        # for every score at once
+        factor_matrix = score_factor_matrix(*(signals[name] for name in FACTOR_INPUT_COLUMNS))
+        scores = weighted_scores_batch(factor_matrix)
+        rows = zip(signals["customer_id"].tolist(), signals["name"], factor_matrix.tolist(), scores.tolist())
+        for cid, name, factors, score in rows:
+            result = HealthOut(
+                id=cid,
+                name=name,
+                factors=dict(zip(FACTOR_KEYS, factors)),
+                weights=WEIGHTS,
+                healthScore=score,
+            )
+            health_cache.put(cid, versions[cid], result)
+            results[cid] = result
+
+    return [results[cid] for cid in requested if cid in results]
+
 
 @app.post("/api/customers/{customer_id}/events", status_code=201, tags=["Ingest"])
 def add_event(customer_id: int, payload: EventIn, db: Session = Depends(get_db)) -> dict:
@@ -226,8 +275,9 @@ def add_event(customer_id: int, payload: EventIn, db: Session = Depends(get_db))
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    # Parse timestamp; allow ISO with space or 'T'
-    ts = datetime.fromisoformat(payload.timestamp) if payload.timestamp else datetime.utcnow()
+    # One clock read per request; parse timestamp, allowing ISO with space or 'T'
+    now = utcnow()
+    ts = datetime.fromisoformat(payload.timestamp) if payload.timestamp else now
 
     t = (payload.type or "").strip()
     meta = payload.meta or {}
@@ -261,9 +311,20 @@ def add_event(customer_id: int, payload: EventIn, db: Session = Depends(get_db))
     else:
         raise HTTPException(status_code=400, detail=f"Unknown event type: {t}")
 
+    # 3) New data version: cached health for this customer no longer matches,
+    #    in this worker and every other one (incremented in SQL, so concurrent
+    #    writers cannot lose a bump)
+    customer.data_version = Customer.data_version + 1
+
+    # 4) Keep the materialized health counts in step with the new activity.
+    #    This flushes, so ev.id is already populated by INSERT ... RETURNING.
+    refresh_health_stats(db, customer_id, now)
+    event_id = ev.id
+
+    # No refresh(ev): commit expires the instance, and reloading it would only
+    # cost another SELECT to read back an id we already have.
     db.commit()
-    db.refresh(ev)
-    return {"id": ev.id, "status": "created"}
+    return {"id": event_id, "status": "created"}
 
 
 @app.get("/", tags=["Meta"])
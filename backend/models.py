@@ -7,15 +7,33 @@ These tables capture customer entities and their related activity:
 - Invoice: billing records with due/paid dates
 - SupportTicket: customer support cases
 - FeatureUsage: adoption of product features
+- CustomerHealthStats: materialized window counts, factor scores and health score
 
-Relationships are bidirectional with cascades for clean deletion.
+Relationships are bidirectional with cascades for clean deletion (except
+`Customer.events`, which is one-way); the customer collections are `raise_on_sql`,
+so they must be eager-loaded explicitly.
+
+Each activity table carries a composite index led by `customer_id` and followed by
+the columns the health queries filter on, so per-customer window counts are a
+short index range scan instead of a heap filter over all of the customer's rows.
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 from .db import Base
 
+
+def utcnow() -> datetime:
+    """
+    Current UTC time as a *naive* datetime, matching the naive `DateTime` columns.
+
+    Replaces the deprecated `datetime.utcnow()`; stripping tzinfo keeps values
+    comparable with stored rows and avoids per-value timezone conversion in drivers.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class Customer(Base):
     """Customer entity with segment, health placeholder, and related activity."""
     __tablename__ = "customers"
@@ -23,29 +41,51 @@ class Customer(Base):
     name = Column(String, nullable=False)
     segment = Column(String, nullable=False, default="SMB")
     health_score = Column(Float, nullable=False, default=0.0)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    # Bumped by every write for this customer; keys the health cache (services.cache).
+    # Existing databases get it from `db.create_missing_columns()` at startup.
+    data_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
-    events = relationship("Event", back_populates="customer", cascade="all, delete-orphan")
-    invoices = relationship("Invoice", back_populates="customer", cascade="all, delete-orphan")
-    tickets = relationship("SupportTicket", back_populates="customer", cascade="all, delete-orphan")
-    features = relationship("FeatureUsage", back_populates="customer", cascade="all, delete-orphan")
+    # Collections never lazy-load: an accidental `customer.events` inside a loop would
+    # be an N+1 query pattern, so it raises instead. Use selectinload() when needed.
+    # One-way: events are the hottest insert path, so Event carries no reverse `customer`
+    events = relationship("Event", cascade="all, delete-orphan", lazy="raise_on_sql")
+    invoices = relationship("Invoice", back_populates="customer", cascade="all, delete-orphan", lazy="raise_on_sql")
+    tickets = relationship("SupportTicket", back_populates="customer", cascade="all, delete-orphan", lazy="raise_on_sql")
+    features = relationship("FeatureUsage", back_populates="customer", cascade="all, delete-orphan", lazy="raise_on_sql")
 
 class Event(Base):
     """Generic audit event: login, API call."""
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_cust_type_ts", "customer_id", "type", "timestamp"),
+        # Partial indexes for the only types health reads: small B-trees that skip
+        # the bulk of audit rows (feature_used, ticket_opened, ...)
+        Index(
+            "ix_events_login", "customer_id", "timestamp",
+            postgresql_where=text("type = 'login'"), sqlite_where=text("type = 'login'"),
+        ),
+        Index(
+            "ix_events_api", "customer_id", "timestamp",
+            postgresql_where=text("type = 'api_call'"), sqlite_where=text("type = 'api_call'"),
+        ),
+    )
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), index=True, nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     type = Column(String, nullable=False)           # login | api_call | feature_used | ticket_opened | payment
-    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
-    meta = Column(JSON, nullable=True)
-
-    customer = relationship("Customer", back_populates="events")
+    timestamp = Column(DateTime, nullable=False, default=utcnow)
+    # JSONB on Postgres: stored pre-parsed (no re-parse on read) and indexable if ever
+    # queried. Existing databases: ALTER TABLE events ALTER COLUMN meta TYPE jsonb USING meta::jsonb
+    meta = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
 
 class Invoice(Base):
     """Billing record with due date, payment date, and amount."""
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_cust_paid_due", "customer_id", "paid_date", "due_date"),
+    )
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), index=True, nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     due_date = Column(DateTime, nullable=False)
     paid_date = Column(DateTime, nullable=True)
     amount = Column(Float, nullable=False, default=0.0)
@@ -55,19 +95,60 @@ class Invoice(Base):
 class SupportTicket(Base):
     """Support case tied to a customer (open/closed)."""
     __tablename__ = "support_tickets"
+    __table_args__ = (
+        Index("ix_support_tickets_cust_created", "customer_id", "created_at"),
+    )
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), index=True, nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     status = Column(String, nullable=False, default="open")  # open | closed
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
 
     customer = relationship("Customer", back_populates="tickets")
 
 class FeatureUsage(Base):
     """Record of a customer using a specific feature at a point in time."""
     __tablename__ = "feature_usage"
+    __table_args__ = (
+        # feature_name last so COUNT(DISTINCT feature_name) can be an index-only scan
+        Index("ix_feature_usage_cust_used_feature", "customer_id", "used_at", "feature_name"),
+    )
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), index=True, nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     feature_name = Column(String, nullable=False)
-    used_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    used_at = Column(DateTime, nullable=False, default=utcnow)
 
     customer = relationship("Customer", back_populates="features")
+
+class CustomerHealthStats(Base):
+    """
+    Materialized health for one customer (one row per customer): the window
+    counts, the five factor scores computed from them, and the weighted score.
+
+    Refreshed whenever events are ingested for the customer (and for everyone by
+    `db/refresh_health.py`), so the health endpoint reads a single primary-key row
+    instead of aggregating and scoring raw activity. Windows are relative to
+    `updated_at`; readers treat a row as stale once the customer's `data_version`
+    has moved past the one it records, or once it is older than a max age.
+
+    The table is derived data: on an existing database it can simply be dropped
+    (`DROP TABLE customer_health_stats`) to pick up new columns; startup recreates
+    it and rows are recomputed on the next read or refresh.
+    """
+    __tablename__ = "customer_health_stats"
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    logins_30d = Column(Integer, nullable=False, default=0)
+    api_30d = Column(Integer, nullable=False, default=0)
+    api_prev_30d = Column(Integer, nullable=False, default=0)
+    distinct_features_90d = Column(Integer, nullable=False, default=0)
+    tickets_90d = Column(Integer, nullable=False, default=0)
+    invoices_on_time = Column(Integer, nullable=False, default=0)
+    invoices_total = Column(Integer, nullable=False, default=0)
+    login_frequency = Column(Float, nullable=False, default=0.0)
+    feature_adoption = Column(Float, nullable=False, default=0.0)
+    support_load = Column(Float, nullable=False, default=0.0)
+    invoice_timeliness = Column(Float, nullable=False, default=0.0)
+    api_trend = Column(Float, nullable=False, default=0.0)
+    health_score = Column(Float, nullable=False, default=0.0)
+    # customers.data_version the row was computed from
+    data_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    updated_at = Column(DateTime, nullable=False, default=utcnow)
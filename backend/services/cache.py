@@ -0,0 +1,60 @@
+"""
+In-process response cache for per-customer health.
+
+The health breakdown is a pure function of the customer's recent rows, and the
+30/60/90-day windows only move meaningfully over minutes, not milliseconds.
+Entries are keyed by customer id and tagged with the customer's `data_version`
+(bumped in the database by every write for that customer) and a coarse time
+bucket (`ttl_seconds` wide). A lookup with a newer version or in a newer bucket
+is a miss, so writes and moving windows both take effect without explicit
+invalidation.
+
+Scope: one dict per process, bounded to `maxsize` customers (least recently used
+dropped first). Because the version lives in the database, a write handled by one
+worker is seen by every other worker on its next lookup.
+
+Thread-safe: sync endpoints run on a threadpool, and an eviction in `put` must not
+interleave with the LRU bookkeeping in `get`, so every operation holds one lock.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class HealthCache:
+    """Per-customer LRU cache; entries expire on a version bump or at the end of their time bucket."""
+
+    def __init__(self, ttl_seconds: int = 60, maxsize: int = 4096) -> None:
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.maxsize = max(1, int(maxsize))
+        self._entries: "OrderedDict[int, Tuple[int, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.ttl_seconds)
+
+    def get(self, customer_id: int, version: int) -> Optional[Any]:
+        """Return the value cached for this version and bucket, or None on miss/expiry."""
+        bucket = self._bucket()
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is None or entry[0] != version or entry[1] != bucket:
+                return None
+            self._entries.move_to_end(customer_id)
+            return entry[2]
+
+    def put(self, customer_id: int, version: int, value: Any) -> None:
+        """Cache `value` for this version and the current bucket (one entry per customer)."""
+        entry = (version, self._bucket(), value)
+        with self._lock:
+            self._entries[customer_id] = entry
+            self._entries.move_to_end(customer_id)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry (used by tests)."""
+        with self._lock:
+            self._entries.clear()
@@ -1,4 +1,4 @@
-# backend/health.py
+# backend/services/health.py
 """
 Health score utilities.
 
@@ -9,9 +9,47 @@ Windows:
 - Invoice timeliness: last few invoices
 
 Weights reflect SaaS retention drivers.
+
+The API trend arithmetic is a Numba kernel (services.health_numba) when Numba is
+installed, plain Python otherwise.
+
+The module type-checks cleanly under mypy, with or without Numba installed (the
+optional import is marked in services.health_numba), so it can be compiled ahead
+of time with mypyc (`mypyc backend/services/health.py`); keep new code fully annotated.
+
+Batch scoring (many customers at once) uses NumPy: `score_factor_matrix` builds an
+(N, 5) factor matrix straight from count columns, and `weighted_scores_batch`
+weights it column by column (in the scalar path's order, so batch and
+single-customer scores round identically).
 """
 
-from typing import Dict
+from typing import Callable, Dict, Optional, Tuple, cast
+
+import numpy as np
+
+from .health_numba import HAS_NUMBA, _api_trend_kernel, score_all
+
+__all__ = [
+    "WEIGHTS",
+    "FACTOR_KEYS",
+    "KEY_FEATURES",
+    "TOTAL_KEY_FEATURES",
+    "score_login_frequency",
+    "score_feature_adoption",
+    "score_support_load",
+    "score_invoice_timeliness_counts",
+    "score_invoice_timeliness_ratio",
+    "score_api_trend",
+    "compute_factors",
+    "weighted_score",
+    "score_login_frequency_vec",
+    "score_feature_adoption_vec",
+    "score_support_load_vec",
+    "score_invoice_timeliness_counts_vec",
+    "score_api_trend_vec",
+    "score_factor_matrix",
+    "weighted_scores_batch",
+]
 
 WEIGHTS: Dict[str, float] = {
     "loginFrequency":     0.25,
@@ -20,12 +58,45 @@ WEIGHTS: Dict[str, float] = {
     "invoiceTimeliness":  0.20,
     "apiTrend":           0.15,
 }
+# The final score is a weighted average on the factors' 0..100 scale
+assert abs(sum(WEIGHTS.values()) - 1.0) < 1e-9, "WEIGHTS must sum to 1"
 
-TOTAL_KEY_FEATURES: int = 5
+# Column order of factor matrices used by the batch scorers
+FACTOR_KEYS: Tuple[str, ...] = ("loginFrequency", "featureAdoption", "supportLoad", "invoiceTimeliness", "apiTrend")
+
+# Frozen (name, weight) pairs: the scalar path iterates a tuple, not a dict view
+_WEIGHTS_ITEMS: Tuple[Tuple[str, float], ...] = tuple(WEIGHTS.items())
+
+# (column in FACTOR_KEYS, weight) in _WEIGHTS_ITEMS order: the batch scorer adds the
+# terms in the same order as `weighted_score`, so their sums are bit-identical (a dot
+# product / BLAS matmul reorders the additions and can flip a .xx5 rounding)
+_WEIGHT_COLUMNS: Tuple[Tuple[int, float], ...] = tuple((FACTOR_KEYS.index(k), w) for k, w in _WEIGHTS_ITEMS)
+
+# Product features that count towards adoption (seed data draws from the same list)
+KEY_FEATURES: Tuple[str, ...] = ("Billing", "Analytics", "Automation", "Integrations", "Collaboration")
+
+TOTAL_KEY_FEATURES: int = len(KEY_FEATURES)
+# Float denominator converted once, not per call (compute_factors)
+_TOTAL_KEY_FEATURES_F = float(TOTAL_KEY_FEATURES)
 
 def _clamp01(x: float) -> float:
+    # Kept as comparisons: interpreted, max(0.0, min(1.0, x)) is ~3x slower (two
+    # builtin calls). The compiled kernels use the min/max form (health_numba).
     return 0.0 if x < 0.0 else 1.0 if x > 1.0 else x
 
+def _round2(x: float) -> float:
+    """
+    Round a non-negative score to 2 decimals, half up.
+
+    Plain float math instead of `round(x, 2)`, which goes through CPython's
+    correctly-rounded decimal conversion; identical except on exact .xx5 ties.
+    """
+    return int(x * 100.0 + 0.5) / 100.0
+
+def _round2_arr(a: np.ndarray) -> np.ndarray:
+    """Array version of `_round2` (same half-up rule, so batch and single paths agree)."""
+    return np.floor(a * 100.0 + 0.5) / 100.0
+
 def _pct(x: float) -> float:
     return _clamp01(x) * 100.0
 
@@ -54,19 +125,159 @@ def score_invoice_timeliness_counts(on_time_invoices: int, total_invoices: int,
 
 def score_api_trend(curr_30d: int, prev_30d: int, smoothing: int = 3) -> float:
     """Score API momentum: compare current vs previous 30d (50 = flat)."""
-    num = curr_30d + smoothing
-    den = max(1, prev_30d + smoothing)
-    ratio = num / den
-    return round(50.0 + 50.0 * (ratio - 1.0) / (ratio + 1.0), 2)
+    # Arithmetic lives in a kernel that is JIT-compiled when Numba is installed
+    return _round2(_api_trend_kernel(curr_30d, prev_30d, smoothing))
+
+def compute_factors(
+    logins_30d: int,
+    distinct_features_90d: int,
+    tickets_90d: int,
+    invoices_on_time: int,
+    invoices_total: int,
+    api_30d: int,
+    api_prev_30d: int,
+) -> Dict[str, float]:
+    """
+    All five factors (0..100) for one customer from its raw window counts.
 
-def weighted_score(factors_0_100: Dict[str, float]) -> float:
-    """Combine factor scores (0–100) using WEIGHTS to produce a final score."""
+    Same results as the individual `score_*` functions with their default
+    targets, fused into one call: the per-request path pays one function frame
+    instead of five (plus their clamp/percent helpers). Argument names match
+    `services.signals.COUNT_COLUMNS`, so `compute_factors(**counts)` works.
+    """
+    # --- Login frequency (last 30d) ---
+    # Frequent logins indicate engagement; normalized against a target of 12 (3/week).
+    login = logins_30d / 12.0
+    # --- Feature adoption (distinct key features used last 90d) ---
+    # Breadth over time: the more key features a customer uses, the stickier they are.
+    feature = distinct_features_90d / _TOTAL_KEY_FEATURES_F if TOTAL_KEY_FEATURES > 0 else 0.5
+    # --- Support load (tickets opened last 90d) ---
+    # Fewer tickets imply less friction; 90d window smooths spikes.
+    support = 1.0 - tickets_90d / 10.0
+    # --- Invoice timeliness (counts, not ratio) ---
+    # total=0 -> neutral (50) to avoid penalizing new customers without billing history
+    invoice = invoices_on_time / float(invoices_total) if invoices_total > 0 else 0.5
+    # --- API usage trend (30d vs previous 30d, smoothing 3) ---
+    # Momentum matters: downtrends (<50) can be early churn signals.
+    ratio = (api_30d + 3) / max(1, api_prev_30d + 3)
+
+    return {
+        "loginFrequency": (0.0 if login < 0.0 else 1.0 if login > 1.0 else login) * 100.0,
+        "featureAdoption": (0.0 if feature < 0.0 else 1.0 if feature > 1.0 else feature) * 100.0,
+        "supportLoad": (0.0 if support < 0.0 else 1.0 if support > 1.0 else support) * 100.0,
+        "invoiceTimeliness": (0.0 if invoice < 0.0 else 1.0 if invoice > 1.0 else invoice) * 100.0,
+        "apiTrend": int((50.0 + 50.0 * (ratio - 1.0) / (ratio + 1.0)) * 100.0 + 0.5) / 100.0,
+    }
+
+def _weighted_score_generic(factors_0_100: Dict[str, float]) -> float:
+    """Reference implementation of `weighted_score`: loop over the weight pairs."""
     total = 0.0
-    for name, w in WEIGHTS.items():
+    for name, w in _WEIGHTS_ITEMS:
         total += w * factors_0_100.get(name, 0.0)
-    return round(total, 2)
+    return _round2(total)
+
+def _specialize_weighted_score(weights: Tuple[Tuple[str, float], ...]) -> Callable[[Dict[str, float]], float]:
+    """
+    Generate `weighted_score` with the weights inlined as literals.
+
+    The body is one expression, `w1 * f.get(k1, 0.0) + ...`, summed in the same
+    order as the loop (so results are bit-identical) with `_round2` inlined: no
+    loop, no tuple unpacking, no extra call. Weights are module constants, so
+    this runs once at import.
+    """
+    terms = " + ".join(f"{w!r} * factors_0_100.get({name!r}, 0.0)" for name, w in weights)
+    src = f"def weighted_score(factors_0_100):\n    return int(({terms}) * 100.0 + 0.5) / 100.0\n"
+    namespace: Dict[str, object] = {}
+    exec(src, namespace)
+    fn = cast(Callable[[Dict[str, float]], float], namespace["weighted_score"])
+    fn.__doc__ = """
+    Combine factor scores (0–100) using WEIGHTS to produce a final score.
+
+    Stays scalar Python: for five values, building a NumPy array costs more than
+    the arithmetic it would vectorize. Use `weighted_scores_batch` for a factor matrix.
+    Generated at import with the weights inlined (see `_specialize_weighted_score`).
+    """
+    fn.__annotations__ = {"factors_0_100": Dict[str, float], "return": float}
+    fn.__module__ = __name__
+    return fn
+
+weighted_score = _specialize_weighted_score(_WEIGHTS_ITEMS)
+
+# ---- Vectorized scorers: same formulas over arrays of counts (one entry per customer) ----
+
+def _clamp01_arr(a: np.ndarray) -> np.ndarray:
+    """Clamp to [0, 1] in place (one pass over the array)."""
+    return np.clip(a, 0.0, 1.0, out=a)
+
+def score_login_frequency_vec(logins_30d: np.ndarray, target: int = 12) -> np.ndarray:
+    """Array version of `score_login_frequency`."""
+    return _clamp01_arr(logins_30d / float(max(1, target))) * 100.0
+
+def score_feature_adoption_vec(distinct_features_used_90d: np.ndarray, total_features: int = TOTAL_KEY_FEATURES) -> np.ndarray:
+    """Array version of `score_feature_adoption`."""
+    if total_features <= 0:
+        return np.full(len(distinct_features_used_90d), 50.0)
+    return _clamp01_arr(distinct_features_used_90d / float(total_features)) * 100.0
+
+def score_support_load_vec(tickets_90d: np.ndarray, max_tickets: int = 10) -> np.ndarray:
+    """Array version of `score_support_load`."""
+    return _clamp01_arr(1.0 - np.minimum(1.0, tickets_90d / max_tickets)) * 100.0
+
+def score_invoice_timeliness_counts_vec(on_time_invoices: np.ndarray, total_invoices: np.ndarray, neutral_if_no_history: bool = True) -> np.ndarray:
+    """Array version of `score_invoice_timeliness_counts`."""
+    has_history = total_invoices > 0
+    ratio = np.divide(on_time_invoices, total_invoices, out=np.zeros(len(total_invoices)), where=has_history)
+    return np.where(has_history, _clamp01_arr(ratio) * 100.0, 50.0 if neutral_if_no_history else 0.0)
+
+def score_api_trend_vec(curr_30d: np.ndarray, prev_30d: np.ndarray, smoothing: int = 3) -> np.ndarray:
+    """Array version of `score_api_trend`."""
+    ratio = (curr_30d + smoothing) / np.maximum(1, prev_30d + smoothing)
+    return _round2_arr(50.0 + 50.0 * (ratio - 1.0) / (ratio + 1.0))
+
+def score_factor_matrix(
+    logins_30d: np.ndarray,
+    distinct_features_90d: np.ndarray,
+    tickets_90d: np.ndarray,
+    invoices_on_time: np.ndarray,
+    invoices_total: np.ndarray,
+    api_30d: np.ndarray,
+    api_prev_30d: np.ndarray,
+    total_features: int = TOTAL_KEY_FEATURES,
+) -> np.ndarray:
+    """
+    All five factors for N customers as an (N, 5) matrix (FACTOR_KEYS order).
+
+    Uses the compiled, multi-threaded `health_numba.score_all` kernel when Numba is
+    installed; otherwise the NumPy `*_vec` scorers, one column at a time.
+    """
+    n = len(logins_30d)
+    out = np.empty((n, len(FACTOR_KEYS)), dtype=np.float64)
+    if HAS_NUMBA:
+        return score_all(
+            logins_30d, distinct_features_90d, tickets_90d, invoices_on_time, invoices_total,
+            api_30d, api_prev_30d, total_features, out,
+        )
+    out[:, 0] = score_login_frequency_vec(logins_30d)
+    out[:, 1] = score_feature_adoption_vec(distinct_features_90d, total_features)
+    out[:, 2] = score_support_load_vec(tickets_90d)
+    out[:, 3] = score_invoice_timeliness_counts_vec(invoices_on_time, invoices_total)
+    out[:, 4] = score_api_trend_vec(api_30d, api_prev_30d)
+    return out
+
+def weighted_scores_batch(factor_matrix: np.ndarray) -> np.ndarray:
+    """
+    Weighted scores for many customers at once.
+
+    `factor_matrix` has shape (N, 5) with columns in FACTOR_KEYS order; returns the
+    (N,) scores rounded to 2 decimals, same as `weighted_score` row by row.
+    """
+    (col, w), *rest = _WEIGHT_COLUMNS
+    total = w * factor_matrix[:, col]
+    for col, w in rest:
+        total += w * factor_matrix[:, col]
+    return _round2_arr(total)
 
-def score_invoice_timeliness_ratio(ratio: float, treat_zero_as_neutral: bool = False) -> float:
+def score_invoice_timeliness_ratio(ratio: Optional[float], treat_zero_as_neutral: bool = False) -> float:
     """
     Convenience scorer when you only have an on-time ratio in [0..1].
     - If treat_zero_as_neutral is True and ratio == 0.0, return 50 (no billing history / unknown).
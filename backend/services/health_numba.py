@@ -0,0 +1,80 @@
+"""
+Optional Numba JIT kernels for the health scorers.
+
+Numba is an optional dependency: when it is installed, the kernels below are
+compiled to native code (`cache=True` keeps the compiled version on disk between
+processes); when it is not, `njit` is a no-op and the same functions run as plain
+Python. Callers use the kernels the same way either way.
+
+`fastmath` is deliberately off: reassociated float math can flip a 2-decimal
+rounding, and scores must not depend on whether Numba is installed.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange  # type: ignore[import-not-found]
+
+    HAS_NUMBA = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAS_NUMBA = False
+    prange = range  # type: ignore[misc]
+
+    def njit(*args, **kwargs):  # type: ignore[no-redef]
+        """No-op stand-in for `numba.njit` (bare or with options)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+
+@njit(cache=True)
+def _api_trend_kernel(curr_30d: int, prev_30d: int, smoothing: int) -> float:
+    """Smoothed current/previous API ratio mapped to 0..100 (50 = flat), unrounded."""
+    num = curr_30d + smoothing
+    den = max(1, prev_30d + smoothing)
+    ratio = num / den
+    return 50.0 + 50.0 * (ratio - 1.0) / (ratio + 1.0)
+
+
+@njit(cache=True, inline="always")
+def _clamp01(x: float) -> float:
+    """Branchless clamp to [0, 1]: LLVM lowers min/max to MINSD/MAXSD."""
+    return max(0.0, min(1.0, x))
+
+
+@njit(parallel=True, cache=True)
+def score_all(logins, feats, tickets, on_time, total, curr, prev, total_features, out):
+    """
+    Fill `out` (N, 5) with every factor score for N customers, one row each.
+
+    Columns follow services.health.FACTOR_KEYS; targets match the scalar scorers'
+    defaults. Rows are independent, so `prange` spreads them across threads.
+    """
+    # Loop invariants hoisted: the feature-count branch and its float denominator.
+    # Divisions stay divisions: x * (1/n) is not always x / n in floating point
+    # (3 * (1/5) * 100 == 60.00000000000001), and batch scores must match the
+    # scalar path exactly.
+    features_neutral = total_features <= 0
+    features_den = float(total_features)
+    for i in prange(logins.shape[0]):
+        out[i, 0] = _clamp01(logins[i] / 12.0) * 100.0
+        if features_neutral:
+            out[i, 1] = 50.0
+        else:
+            out[i, 1] = _clamp01(feats[i] / features_den) * 100.0
+        out[i, 2] = _clamp01(1.0 - tickets[i] / 10.0) * 100.0
+        if total[i] <= 0:
+            out[i, 3] = 50.0
+        else:
+            out[i, 3] = _clamp01(on_time[i] / total[i]) * 100.0
+        # 2-decimal half-up rounding, as services.health._round2
+        out[i, 4] = int(_api_trend_kernel(curr[i], prev[i], 3) * 100.0 + 0.5) / 100.0
+    return out
+
+
+# Compile at import so the first request does not pay the JIT cost
+if HAS_NUMBA:  # pragma: no cover - depends on the environment
+    _api_trend_kernel(0, 0, 3)
+    # int32 like services.signals.COUNT_DTYPE, so this is the specialization requests use
+    _warm = np.zeros(1, dtype=np.int32)
+    score_all(_warm, _warm, _warm, _warm, _warm, _warm, _warm, 5, np.empty((1, 5), dtype=np.float64))
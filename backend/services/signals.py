@@ -0,0 +1,401 @@
+"""
+Health signal queries.
+
+Database-side aggregation of the raw counts behind the health factors
+(see `services.health` for the pure scoring functions).
+
+All seven counts for any number of customers come back from a single statement:
+each source table is reduced to a `GROUP BY customer_id` aggregate subquery
+(conditional counts use `COUNT(*) FILTER (WHERE ...)`), and the subqueries are
+left-joined onto `customers`, one output row per customer. One round-trip,
+whether the caller asks for one customer or a whole dashboard page. Batch
+results come back as NumPy columns (`fetch_signals_soa`) for the array scorers.
+
+Both statements are built once at import and executed with bound parameters.
+The single-customer hot path is a hand-written `text()` statement (typed binds
+and result columns) executed directly on the session's connection: no expression
+tree to build or compile per request, and no ORM result processing for what is
+a single row of integers.
+
+Feature adoption counts *key* features (services.health.KEY_FEATURES) with one
+`MAX(CASE WHEN feature_name = ... THEN 1 ELSE 0 END)` flag per feature, summed:
+a streaming aggregate over the covering index instead of the sort/hash behind
+`COUNT(DISTINCT ...)`.
+
+The counts, the factor scores computed from them and the weighted score are
+materialized per customer in `customer_health_stats` (`upsert_health_stats`),
+refreshed on ingest and by the periodic `refresh_all_health_stats` job.
+Each row records the customer `data_version` it was computed from; `load_health`
+serves it while that version is current and the row is recent, and recomputes
+it otherwise.
+"""
+
+import operator
+import os
+from datetime import datetime, timedelta
+from functools import reduce
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import DateTime, Integer, Select, String, and_, bindparam, case, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models import Customer, CustomerHealthStats, Event, FeatureUsage, Invoice, SupportTicket
+from .health import FACTOR_KEYS, KEY_FEATURES, compute_factors, score_factor_matrix, weighted_score, weighted_scores_batch
+
+# Column order of every counts row (after customer id)
+COUNT_COLUMNS = (
+    "logins_30d",
+    "api_30d",
+    "api_prev_30d",
+    "distinct_features_90d",
+    "tickets_90d",
+    "invoices_on_time",
+    "invoices_total",
+)
+
+# Stored factor score columns of customer_health_stats, in FACTOR_KEYS order
+FACTOR_COLUMNS = ("login_frequency", "feature_adoption", "support_load", "invoice_timeliness", "api_trend")
+# Everything an upsert overwrites
+STATS_COLUMNS = (*COUNT_COLUMNS, *FACTOR_COLUMNS, "health_score", "data_version", "updated_at")
+# Count columns in `health.score_factor_matrix` argument order
+FACTOR_INPUT_COLUMNS = (
+    "logins_30d",
+    "distinct_features_90d",
+    "tickets_90d",
+    "invoices_on_time",
+    "invoices_total",
+    "api_30d",
+    "api_prev_30d",
+)
+
+# Batch count columns are int32: window counts fit easily, and half-width columns
+# halve the bytes the batch scorers stream through
+COUNT_DTYPE = np.int32
+SOA_DTYPES = {"customer_id": np.int64, "name": object, "data_version": np.int64}
+
+# An invoice is on time when it was paid, and paid no later than its due date.
+# Unpaid invoices count towards the total only.
+INVOICE_ON_TIME = and_(Invoice.paid_date.isnot(None), Invoice.paid_date <= Invoice.due_date)
+
+# Distinct key features used: one 0/1 flag per feature, added up
+KEY_FEATURES_USED = reduce(
+    operator.add,
+    (func.max(case((FeatureUsage.feature_name == name, 1), else_=0)) for name in KEY_FEATURES),
+)
+# Same expression for the text() statement; feature names are bound as :feature_<i>
+_KEY_FEATURES_USED_SQL = " + ".join(
+    f"max(CASE WHEN f.feature_name = :feature_{i} THEN 1 ELSE 0 END)" for i in range(len(KEY_FEATURES))
+)
+
+# Materialized counts older than this are recomputed on read (rolling windows move
+# even without new events; an hour is ~0.1% of a 30-day window)
+STATS_MAX_AGE = timedelta(seconds=int(os.getenv("HEALTH_STATS_MAX_AGE", "3600")))
+
+
+# One row of seven counts plus the customer's data_version (NULL for an unknown
+# customer) for a single customer; binds: cid, d30, d60, d90
+HEALTH_COUNTS_SQL = (
+    text(
+        """
+        SELECT ev.logins_30d, ev.api_30d, ev.api_prev_30d,
+               fu.distinct_features_90d, st.tickets_90d,
+               inv.invoices_on_time, inv.invoices_total,
+               (SELECT c.data_version FROM customers c WHERE c.id = :cid) AS data_version
+        FROM (
+            SELECT count(*) FILTER (WHERE e.type = 'login' AND e.timestamp >= :d30) AS logins_30d,
+                   count(*) FILTER (WHERE e.type = 'api_call' AND e.timestamp >= :d30) AS api_30d,
+                   count(*) FILTER (WHERE e.type = 'api_call' AND e.timestamp < :d30) AS api_prev_30d
+            FROM events e
+            WHERE e.customer_id = :cid
+              AND e.type IN ('login', 'api_call')
+              AND e.timestamp >= :d60
+        ) AS ev
+        CROSS JOIN (
+            SELECT coalesce(""" + _KEY_FEATURES_USED_SQL + """, 0) AS distinct_features_90d
+            FROM feature_usage f
+            WHERE f.customer_id = :cid AND f.used_at >= :d90
+        ) AS fu
+        CROSS JOIN (
+            SELECT count(*) AS tickets_90d
+            FROM support_tickets t
+            WHERE t.customer_id = :cid AND t.created_at >= :d90
+        ) AS st
+        CROSS JOIN (
+            SELECT count(*) FILTER (WHERE i.paid_date IS NOT NULL AND i.paid_date <= i.due_date) AS invoices_on_time,
+                   count(*) AS invoices_total
+            FROM invoices i
+            WHERE i.customer_id = :cid
+        ) AS inv
+        """
+    )
+    .bindparams(
+        bindparam("cid", type_=Integer),
+        bindparam("d30", type_=DateTime),
+        bindparam("d60", type_=DateTime),
+        bindparam("d90", type_=DateTime),
+        *(bindparam(f"feature_{i}", name, type_=String) for i, name in enumerate(KEY_FEATURES)),
+    )
+    .columns(**{name: Integer for name in (*COUNT_COLUMNS, "data_version")})
+)
+
+
+def _build_health_counts_many_stmt(by_ids: bool = True) -> Select:
+    """
+    Build the per-customer aggregate over events, feature usage, tickets and invoices.
+
+    Binds: ids (expanding IN list; only when `by_ids`), d30, d60, d90.
+    Columns:
+        customer_id, name, data_version, then COUNT_COLUMNS (0 when a customer has
+        no matching rows).
+    Customers that do not exist produce no row. Without `by_ids`, every customer
+    gets a row (bulk scoring).
+    """
+    customer_ids = bindparam("ids", expanding=True)
+
+    def for_customers(stmt: Select, column) -> Select:
+        return stmt.where(column.in_(customer_ids)) if by_ids else stmt
+
+    d30 = bindparam("d30", type_=DateTime)
+    d60 = bindparam("d60", type_=DateTime)
+    d90 = bindparam("d90", type_=DateTime)
+
+    # Logins and API calls share one scan of the last 60 days of events
+    events = (
+        for_customers(select(
+            Event.customer_id,
+            func.count().filter(Event.type == "login", Event.timestamp >= d30).label("logins_30d"),
+            func.count().filter(Event.type == "api_call", Event.timestamp >= d30).label("api_30d"),
+            func.count().filter(Event.type == "api_call", Event.timestamp < d30).label("api_prev_30d"),
+        ), Event.customer_id)
+        .where(Event.type.in_(("login", "api_call")))
+        .where(Event.timestamp >= d60)
+        .group_by(Event.customer_id)
+        .subquery("ev")
+    )
+    features = (
+        for_customers(select(
+            FeatureUsage.customer_id,
+            KEY_FEATURES_USED.label("distinct_features_90d"),
+        ), FeatureUsage.customer_id)
+        .where(FeatureUsage.used_at >= d90)
+        .group_by(FeatureUsage.customer_id)
+        .subquery("fu")
+    )
+    tickets = (
+        for_customers(select(SupportTicket.customer_id, func.count().label("tickets_90d")), SupportTicket.customer_id)
+        .where(SupportTicket.created_at >= d90)
+        .group_by(SupportTicket.customer_id)
+        .subquery("st")
+    )
+    # On-time and total invoices from one scan of invoices
+    invoices = (
+        for_customers(select(
+            Invoice.customer_id,
+            func.count().filter(INVOICE_ON_TIME).label("invoices_on_time"),
+            func.count().label("invoices_total"),
+        ), Invoice.customer_id)
+        .group_by(Invoice.customer_id)
+        .subquery("inv")
+    )
+
+    return for_customers(
+        select(
+            Customer.id.label("customer_id"),
+            Customer.name,
+            Customer.data_version,
+            func.coalesce(events.c.logins_30d, 0).label("logins_30d"),
+            func.coalesce(events.c.api_30d, 0).label("api_30d"),
+            func.coalesce(events.c.api_prev_30d, 0).label("api_prev_30d"),
+            func.coalesce(features.c.distinct_features_90d, 0).label("distinct_features_90d"),
+            func.coalesce(tickets.c.tickets_90d, 0).label("tickets_90d"),
+            func.coalesce(invoices.c.invoices_on_time, 0).label("invoices_on_time"),
+            func.coalesce(invoices.c.invoices_total, 0).label("invoices_total"),
+        )
+        .select_from(Customer)
+        .outerjoin(events, events.c.customer_id == Customer.id)
+        .outerjoin(features, features.c.customer_id == Customer.id)
+        .outerjoin(tickets, tickets.c.customer_id == Customer.id)
+        .outerjoin(invoices, invoices.c.customer_id == Customer.id),
+        Customer.id,
+    )
+
+
+# Built once at import; executions only bind parameters and hit the compiled cache
+HEALTH_COUNTS_MANY_STMT = _build_health_counts_many_stmt()
+HEALTH_COUNTS_ALL_STMT = _build_health_counts_many_stmt(by_ids=False)
+
+
+def window_params(now: datetime) -> Dict[str, datetime]:
+    """Window start bind parameters (d30/d60/d90) relative to `now`."""
+    return {
+        "d30": now - timedelta(days=30),
+        "d60": now - timedelta(days=60),
+        "d90": now - timedelta(days=90),
+    }
+
+
+def fetch_signals_soa(
+    db: Session, customer_ids: Optional[Sequence[int]], now: datetime
+) -> Dict[str, np.ndarray]:
+    """
+    Fetch health input counts for many customers as column arrays, in one round-trip.
+
+    The grouped rows are transposed straight into NumPy columns (structure of
+    arrays) without building a dict per customer, ready for the batch scorers.
+    `customer_ids=None` covers every customer.
+
+    Returns:
+        Dict[str, np.ndarray]: "customer_id" (int64), "name" (object),
+        "data_version" (int64) and one COUNT_DTYPE array per COUNT_COLUMNS entry,
+        all aligned by row. Unknown ids are absent.
+    """
+    if customer_ids is None:
+        rows = db.execute(HEALTH_COUNTS_ALL_STMT, window_params(now)).all()
+    elif customer_ids:
+        rows = db.execute(HEALTH_COUNTS_MANY_STMT, {"ids": list(customer_ids), **window_params(now)}).all()
+    else:
+        rows = []
+
+    names = ("customer_id", "name", "data_version", *COUNT_COLUMNS)
+    if not rows:
+        return {name: np.empty(0, dtype=SOA_DTYPES.get(name, COUNT_DTYPE)) for name in names}
+    return {
+        name: np.array(column, dtype=SOA_DTYPES.get(name, COUNT_DTYPE))
+        for name, column in zip(names, zip(*rows))
+    }
+
+
+def fetch_health_counts(db: Session, customer_id: int, now: datetime) -> Tuple[Dict[str, int], Optional[int]]:
+    """
+    Fetch all health input counts for one customer, and the customer's current
+    data_version, in a single round-trip.
+
+    Returns:
+        (counts, data_version): count name -> count (see COUNT_COLUMNS).
+        Aggregates always yield one row, so unknown customers get all zeros and
+        a None version.
+    """
+    params = {"cid": customer_id, **window_params(now)}
+    *counts, data_version = db.connection().execute(HEALTH_COUNTS_SQL, params).one()
+    return dict(zip(COUNT_COLUMNS, counts)), data_version
+
+
+def _health_row(
+    customer_id: int, data_version: int, counts: Dict[str, int], factors: Dict[str, float], score: float, now: datetime
+) -> Dict:
+    """One `customer_health_stats` row: counts, factor scores (column names), score."""
+    row = {"customer_id": customer_id, "data_version": data_version, "updated_at": now, "health_score": score, **counts}
+    for key, column in zip(FACTOR_KEYS, FACTOR_COLUMNS):
+        row[column] = factors[key]
+    return row
+
+
+def upsert_health_stats(db: Session, rows: Sequence[Dict]) -> None:
+    """
+    Insert or overwrite materialized health rows (caller commits).
+
+    Uses `INSERT ... ON CONFLICT (customer_id) DO UPDATE` on Postgres/SQLite, one
+    executemany for any number of rows, with no read-before-write. An existing row
+    is only replaced by one computed at the same or a later `updated_at`: the bulk
+    refresh reads one snapshot at its start, and must not overwrite a row an ingest
+    committed while it ran.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(CustomerHealthStats)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(CustomerHealthStats)
+    else:
+        for row in rows:
+            db.merge(CustomerHealthStats(**row))
+        return
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CustomerHealthStats.customer_id],
+        set_={name: stmt.excluded[name] for name in STATS_COLUMNS},
+        where=CustomerHealthStats.updated_at <= stmt.excluded.updated_at,
+    )
+    db.execute(stmt, list(rows))
+
+
+def refresh_health_stats(db: Session, customer_id: int, now: datetime) -> Tuple[Dict[str, float], float]:
+    """
+    Recompute a customer's counts from raw activity, score them, and materialize
+    the result (caller commits).
+
+    Pending ORM rows (and a pending data_version bump) are flushed first, so the
+    aggregate sees them and the row records the version it reflects.
+
+    Returns:
+        (factors, health score)
+    """
+    db.flush()
+    counts, data_version = fetch_health_counts(db, customer_id, now)
+    factors = compute_factors(**counts)
+    score = weighted_score(factors)
+    upsert_health_stats(db, [_health_row(customer_id, data_version, counts, factors, score, now)])
+    return factors, score
+
+
+def refresh_all_health_stats(db: Session, now: datetime) -> int:
+    """
+    Recompute and materialize health for every customer (caller commits).
+
+    For the periodic job (`db/refresh_health.py`) that moves rolling windows
+    forward for customers without recent writes: one grouped aggregate, the batch
+    scorers, and one executemany upsert.
+
+    Returns:
+        int: number of customers refreshed.
+    """
+    signals = fetch_signals_soa(db, None, now)
+    n = len(signals["customer_id"])
+    if not n:
+        return 0
+    factor_matrix = score_factor_matrix(*(signals[name] for name in FACTOR_INPUT_COLUMNS))
+    scores = weighted_scores_batch(factor_matrix)
+
+    count_columns = [signals[name].tolist() for name in COUNT_COLUMNS]
+    rows = []
+    for i, (cid, version, factors, score) in enumerate(
+        zip(signals["customer_id"].tolist(), signals["data_version"].tolist(), factor_matrix.tolist(), scores.tolist())
+    ):
+        row = {"customer_id": cid, "data_version": version, "updated_at": now, "health_score": score}
+        row.update(zip(COUNT_COLUMNS, (column[i] for column in count_columns)))
+        row.update(zip(FACTOR_COLUMNS, factors))
+        rows.append(row)
+    upsert_health_stats(db, rows)
+    return n
+
+
+def stats_are_fresh(stats: Optional[CustomerHealthStats], data_version: int, now: datetime) -> bool:
+    """
+    True when a materialized row can be served as-is: it was computed from the
+    customer's current `data_version` (no write since) and within STATS_MAX_AGE.
+    """
+    return stats is not None and stats.data_version == data_version and now - stats.updated_at < STATS_MAX_AGE
+
+
+def stats_factors(stats: CustomerHealthStats) -> Dict[str, float]:
+    """A materialized row's factor scores, keyed like `compute_factors`."""
+    return {key: getattr(stats, column) for key, column in zip(FACTOR_KEYS, FACTOR_COLUMNS)}
+
+
+def load_health(
+    db: Session, customer_id: int, data_version: int, stats: Optional[CustomerHealthStats], now: datetime
+) -> Tuple[Dict[str, float], float, bool]:
+    """
+    Return a customer's factors and health score from its materialized row when
+    fresh (see `stats_are_fresh`), else recompute (and rewrite) them.
+
+    Returns:
+        (factors, health score, refreshed): `refreshed` is True when the row was
+        rewritten and the caller needs to commit.
+    """
+    if stats_are_fresh(stats, data_version, now):
+        return stats_factors(stats), stats.health_score, False
+    factors, score = refresh_health_stats(db, customer_id, now)
+    return factors, score, True
@@ -6,29 +6,27 @@ Pytest fixtures for FastAPI + SQLAlchemy tests.
 Goals:
 - Provide a fast, isolated test database (SQLite) that does NOT touch the real Postgres.
 - Override the app's `get_db` dependency so API tests use the test Session.
-- Create tables once per test session, and clean rows between tests.
+- Create tables once per test session, and roll back each test's writes.
 
-Why SQLite (file) and not in-memory?
+Why in-memory SQLite with a StaticPool?
 - FastAPI's TestClient may run requests in different threads.
 - SQLite in-memory DB is process-local *and* connection-local; different connections
   would see different (empty) DBs.
-- Using a temporary **file-backed** SQLite database gives us:
-  - one physical DB visible to all connections in the test process,
-  - good speed,
+- `StaticPool` hands every checkout the *same* single connection (with
+  `check_same_thread=False`), so all code in the test process sees one database:
+  - no files, journals or fsyncs in the test loop,
   - no external services required (no Docker/Postgres needed for unit/integration tests).
 
 Fixture scopes:
-- `test_engine_dbfile`: session-scoped temp file path; removed at the end.
-- `test_engine`: session-scoped SQLAlchemy Engine bound to that file; creates tables once.
-- `db_session`: function-scoped Session; cleans all tables between tests.
+- `test_engine`: session-scoped in-memory SQLAlchemy Engine; creates tables once.
+- `db_session`: function-scoped Session inside a transaction rolled back after each test.
 - `client`: function-scoped FastAPI TestClient with `get_db` dependency overridden to use `db_session`.
 """
 
-import os
-import tempfile
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
 # Ensure project root is on sys.path so `import backend.*` works during pytest collection
@@ -41,37 +39,19 @@ if ROOT_DIR not in sys.path:
 # Import the app and ORM metadata so we can:
 # - create tables on the test engine
 # - override the app's DB dependency
-from backend.main import app
+from backend.main import app, health_cache
 from backend.db import Base
 from backend.models import Customer, Event, Invoice, SupportTicket, FeatureUsage
 
 
 @pytest.fixture(scope="session")
-def test_engine_dbfile():
+def test_engine():
     """
-    Create a temporary SQLite **file** and return its path.
+    Create a SQLAlchemy Engine on a shared in-memory SQLite database.
 
-    We deliberately choose a *file-backed* SQLite DB (not `:memory:`) to avoid
-    threading/connection visibility issues during tests.
-
-    Yields:
-        str: Absolute path to the temporary .db file.
-
-    Cleanup:
-        Attempts to remove the file at the end of the test session.
-        (If something still has the file open on Windows, removal may be deferred.)
-    """
-    fd, path = tempfile.mkstemp(suffix=".db")
-    os.close(fd)  # close the OS-level handle; SQLAlchemy will manage connections
-    yield path
-
-
-@pytest.fixture(scope="session")
-def test_engine(test_engine_dbfile):
-    """
-    Create a SQLAlchemy Engine bound to the temporary SQLite database file.
-
-    - `check_same_thread=False` allows the same connection to be used across threads,
+    - `StaticPool` keeps one connection for the whole session, so every checkout
+      sees the same in-memory database.
+    - `check_same_thread=False` allows that connection to be used across threads,
       which the TestClient may do under the hood.
     - `Base.metadata.create_all` creates tables once for the entire test session.
 
@@ -79,20 +59,25 @@ def test_engine(test_engine_dbfile):
         sqlalchemy.engine.Engine: Engine connected to the test SQLite DB.
     """
     engine = create_engine(
-        f"sqlite:///{test_engine_dbfile}",
+        "sqlite://",
         connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
         future=True,
     )
+    # pysqlite manages BEGIN itself and breaks SAVEPOINT semantics; take over
+    # transaction control so the rollback-per-test fixture below works
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
     # Create all ORM tables once per session (fast and sufficient for tests)
     Base.metadata.create_all(bind=engine)
     yield engine
-
-    # --- Teardown in correct order for Windows ---
-    engine.dispose()  # release file handle
-    try:
-        os.remove(test_engine_dbfile)
-    except FileNotFoundError:
-        pass
+    engine.dispose()
 
 
 @pytest.fixture(scope="function")
@@ -101,24 +86,22 @@ def db_session(test_engine):
     Provide a fresh SQLAlchemy Session for each test function.
 
     Behavior:
-    - Yields a Session bound to the shared test Engine.
-    - After the test, closes the Session and deletes all rows from all tables,
-      ensuring tests are isolated and order-independent.
-
-    Notes:
-    - We delete rows in **reverse dependency order** (`reversed(Base.metadata.sorted_tables)`)
-      so child tables are cleared before parent tables, avoiding FK constraint issues.
+    - Opens one connection and begins an outer transaction on it.
+    - Yields a Session joined to that transaction in "create_savepoint" mode: the
+      test's (and the app's) `commit()` / `rollback()` only release or roll back
+      a SAVEPOINT, never the outer transaction.
+    - After the test, rolls the outer transaction back, discarding every write at
+      once, so tests are isolated and order-independent without per-table DELETEs.
     """
-    TestingSessionLocal = sessionmaker(bind=test_engine, autocommit=False, autoflush=False)
-    session = TestingSessionLocal()
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        # Clean all tables between tests (keeps schema, wipes data)
-        for tbl in reversed(Base.metadata.sorted_tables):
-            session.execute(tbl.delete())
-        session.commit()
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture(scope="function")
@@ -129,7 +112,8 @@ def client(db_session):
     How it works:
     - Overrides the app's `get_db` dependency to yield our `db_session`.
     - Any request made via this client will use the SQLite test DB.
-    - After the test, dependency overrides are cleared.
+    - After the test, dependency overrides and the health response cache are cleared
+      (SQLite reuses ids once rows are rolled back, so cached entries must not leak).
 
     Usage in tests:
         def test_something(client, db_session):
@@ -154,3 +138,4 @@ def client(db_session):
         yield c
     # Ensure we leave the app in a clean state for subsequent tests
     app.dependency_overrides.clear()
+    health_cache.clear()
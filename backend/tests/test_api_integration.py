@@ -9,6 +9,7 @@ What these tests verify (end-to-end-ish):
 - Health calculation pulls from multiple tables and stays within [0..100].
 - Posting new events changes health input data (behavioral change over time).
 - Proper error handling for critical paths: 404 on missing customer, 422 on bad payload.
+- The real `SessionMiddleware` + `get_db` wiring (no override): one session per request.
 
 Notes:
 - The database and app wiring for tests are configured in `tests/conftest.py`.
@@ -16,9 +17,17 @@ Notes:
 """
 
 from datetime import datetime, timedelta
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from backend import db as db_module
 
 # ORM models: used to insert domain rows the API will later read
-from backend.models import Customer, Event, Invoice, SupportTicket, FeatureUsage
+from backend.models import Customer, Event, Invoice, SupportTicket, FeatureUsage, CustomerHealthStats
+from backend.main import health_cache
+from backend.services.signals import STATS_MAX_AGE, fetch_signals_soa, refresh_all_health_stats
 
 
 def test_get_customers_list(client, db_session):
@@ -76,19 +85,25 @@ def test_get_customer_health_breakdown(client, db_session):
 
     now = datetime.utcnow()
 
+    # Rows go in as one multi-row INSERT per table (list of parameter dicts)
     # A few logins in the last 30 days
-    for _ in range(3):
-        db_session.add(Event(customer_id=c.id, type="login", timestamp=now - timedelta(days=3)))
+    db_session.execute(insert(Event), [
+        {"customer_id": c.id, "type": "login", "timestamp": now - timedelta(days=3)},
+    ] * 3)
 
     # Two distinct features in the last 90 days -> adoption > 0
-    db_session.add(FeatureUsage(customer_id=c.id, feature_name="Analytics",  used_at=now - timedelta(days=10)))
-    db_session.add(FeatureUsage(customer_id=c.id, feature_name="Automation", used_at=now - timedelta(days=5)))
+    db_session.execute(insert(FeatureUsage), [
+        {"customer_id": c.id, "feature_name": "Analytics", "used_at": now - timedelta(days=10)},
+        {"customer_id": c.id, "feature_name": "Automation", "used_at": now - timedelta(days=5)},
+    ])
 
     # Two invoices; both paid on/before due date -> strong timeliness (clarified: no unused vars)
     due1 = now - timedelta(days=20)
     due2 = now - timedelta(days=50)
-    db_session.add(Invoice(customer_id=c.id, due_date=due1, paid_date=due1, amount=100.0))
-    db_session.add(Invoice(customer_id=c.id, due_date=due2, paid_date=due2, amount=120.0))
+    db_session.execute(insert(Invoice), [
+        {"customer_id": c.id, "due_date": due1, "paid_date": due1, "amount": 100.0},
+        {"customer_id": c.id, "due_date": due2, "paid_date": due2, "amount": 120.0},
+    ])
 
     # One support ticket in the last 90 days
     db_session.add(SupportTicket(customer_id=c.id, status="closed", created_at=now - timedelta(days=15)))
@@ -140,6 +155,7 @@ def test_post_event_increases_login_score(client, db_session):
     # Act: add a login event (minimal valid payload)
     r2 = client.post(f"/api/customers/{c.id}/events", json={"type": "login"})
     assert r2.status_code == 201
+    assert db_session.get(Event, r2.json()["id"]).type == "login"
 
     # Recompute health after ingesting the event
     r3 = client.get(f"/api/customers/{c.id}/health")
@@ -197,4 +213,410 @@ def test_post_event_validation_and_missing_customer_errors(client, db_session):
         f"/api/customers/{c.id}/events",
         json={"timestamp": datetime.utcnow().isoformat()}  # missing 'type'
     )
-    assert res2.status_code == 422
\ No newline at end of file
+    assert res2.status_code == 422
+
+def test_health_factors_respect_windows(client, db_session):
+    """
+    GET /api/customers/{id}/health counts each signal inside its own window.
+
+    Why this matters:
+    - All raw counts are fetched by one aggregate statement; this pins down that
+      each conditional count still applies its own 30d/60d/90d boundary.
+
+    Scenario:
+    - 6 logins in the last 30d, 1 login 40 days ago (outside the login window)
+    - 4 API calls this 30d, 2 in the previous 30d, 1 older than 60d (ignored)
+    - 1 feature used within 90d, 1 feature only used 120 days ago (ignored)
+    - 2 tickets within 90d, 1 older ticket (ignored)
+    - 1 of 2 invoices paid on time
+    """
+    c = Customer(name="WindowCo", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+
+    now = datetime.utcnow()
+    def event(type_, days_ago):
+        return {"customer_id": c.id, "type": type_, "timestamp": now - timedelta(days=days_ago)}
+
+    db_session.execute(
+        insert(Event),
+        [event("login", 2)] * 6 + [event("login", 40)]
+        + [event("api_call", 5)] * 4 + [event("api_call", 45)] * 2 + [event("api_call", 75)],
+    )
+
+    db_session.execute(insert(FeatureUsage), [
+        {"customer_id": c.id, "feature_name": "Analytics", "used_at": now - timedelta(days=10)},
+        {"customer_id": c.id, "feature_name": "Billing", "used_at": now - timedelta(days=120)},
+    ])
+
+    db_session.execute(insert(SupportTicket), [
+        {"customer_id": c.id, "status": "open", "created_at": now - timedelta(days=20)},
+        {"customer_id": c.id, "status": "closed", "created_at": now - timedelta(days=60)},
+        {"customer_id": c.id, "status": "closed", "created_at": now - timedelta(days=100)},
+    ])
+
+    due = now - timedelta(days=30)
+    db_session.execute(insert(Invoice), [
+        {"customer_id": c.id, "due_date": due, "paid_date": due, "amount": 100.0},
+        {"customer_id": c.id, "due_date": due, "paid_date": due + timedelta(days=5), "amount": 100.0},
+    ])
+    db_session.commit()
+
+    res = client.get(f"/api/customers/{c.id}/health")
+    assert res.status_code == 200
+    factors = res.json()["factors"]
+
+    assert factors["loginFrequency"] == 50.0       # 6 / 12
+    assert factors["featureAdoption"] == 20.0      # 1 / 5
+    assert factors["supportLoad"] == 80.0          # 1 - 2 / 10
+    assert factors["invoiceTimeliness"] == 50.0    # 1 / 2
+    assert factors["apiTrend"] == 58.33            # (4+3) vs (2+3), smoothed
+
+
+def test_health_is_cached_until_new_event(client, db_session):
+    """
+    GET /api/customers/{id}/health is served from the response cache until the
+    customer's data_version changes.
+
+    Flow:
+    1) Compute health once (cache miss), then insert a login directly in the DB.
+    2) A second GET returns the cached breakdown (direct writes keep the version).
+    3) POSTing an event bumps the version, so the next GET sees both logins.
+    4) A bump made by another writer (here: directly in the DB) also misses,
+       which is how other workers' caches learn about a write.
+    """
+    c = Customer(name="CacheCo", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+
+    first = client.get(f"/api/customers/{c.id}/health").json()
+    assert first["factors"]["loginFrequency"] == 0.0
+
+    db_session.add(Event(customer_id=c.id, type="login", timestamp=datetime.utcnow()))
+    db_session.commit()
+    assert client.get(f"/api/customers/{c.id}/health").json() == first
+
+    assert client.post(f"/api/customers/{c.id}/events", json={"type": "login"}).status_code == 201
+    after = client.get(f"/api/customers/{c.id}/health").json()
+    assert abs(after["factors"]["loginFrequency"] - 2 / 12 * 100) < 1e-9
+
+    db_session.add(Event(customer_id=c.id, type="login", timestamp=datetime.utcnow()))
+    db_session.commit()
+    assert client.get(f"/api/customers/{c.id}/health").json() == after
+    db_session.refresh(c)
+    c.data_version += 1
+    db_session.commit()
+    bumped = client.get(f"/api/health?ids={c.id}").json()[0]
+    assert abs(bumped["factors"]["loginFrequency"] - 3 / 12 * 100) < 1e-9
+
+
+def test_batch_health_matches_single_endpoint(client, db_session):
+    """
+    GET /api/health?ids=... returns the same breakdown as the per-customer endpoint.
+
+    Why this matters:
+    - The batch path scores many customers from one grouped aggregate query;
+      it must agree with the single-customer computation.
+
+    Flow:
+    1) Arrange: two customers with different activity.
+    2) Act:     Call the batch endpoint (including an unknown id and a duplicate),
+                then each single endpoint.
+    3) Assert:  Unknown ids are skipped, order follows `ids`, and breakdowns match.
+    """
+    a = Customer(name="BatchA", segment="SMB", health_score=0.0)
+    b = Customer(name="BatchB", segment="startup", health_score=0.0)
+    db_session.add_all([a, b])
+    db_session.commit()
+
+    now = datetime.utcnow()
+    db_session.execute(insert(Event), [
+        {"customer_id": a.id, "type": "login", "timestamp": now - timedelta(days=1)},
+    ] * 9)
+    db_session.add(Event(customer_id=b.id, type="api_call", timestamp=now - timedelta(days=40)))
+    db_session.add(SupportTicket(customer_id=b.id, status="open", created_at=now - timedelta(days=3)))
+    db_session.add(Invoice(customer_id=b.id, due_date=now, paid_date=now + timedelta(days=2), amount=10.0))
+    db_session.commit()
+
+    res = client.get(f"/api/health?ids={b.id},999999,{a.id},{b.id}")
+    assert res.status_code == 200
+    batch = res.json()
+    assert [row["id"] for row in batch] == [b.id, a.id]
+
+    for row in batch:
+        # The batch call cached its rows; recompute the single breakdown independently
+        health_cache.clear()
+        single = client.get(f"/api/customers/{row['id']}/health").json()
+        assert row == single
+
+    assert client.get("/api/health?ids=1,abc").status_code == 400
+
+
+def test_batch_and_single_endpoints_read_the_same_stats_row(client, db_session):
+    """
+    The batch and single endpoints share cache entries, so they must agree on the
+    source: both serve a fresh stats row (even one that differs from raw
+    activity), and both recompute from raw activity once the row is stale.
+    """
+    c = Customer(name="SameSource", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+    assert client.post(f"/api/customers/{c.id}/events", json={"type": "login"}).status_code == 201
+
+    stats = db_session.get(CustomerHealthStats, c.id)
+    stats.login_frequency = 100.0
+    stats.health_score = 99.0
+    db_session.commit()
+
+    health_cache.clear()
+    batch = client.get(f"/api/health?ids={c.id}").json()
+    health_cache.clear()
+    single = client.get(f"/api/customers/{c.id}/health").json()
+    assert batch == [single]
+    assert single["factors"]["loginFrequency"] == 100.0
+    assert single["healthScore"] == 99.0
+
+    # A write the row does not reflect makes it stale for both endpoints
+    db_session.get(Customer, c.id).data_version += 1
+    db_session.commit()
+    health_cache.clear()
+    batch = client.get(f"/api/health?ids={c.id}").json()
+    health_cache.clear()
+    single = client.get(f"/api/customers/{c.id}/health").json()
+    assert batch == [single]
+    assert single["factors"]["loginFrequency"] < 100.0
+
+
+def test_health_reads_materialized_stats(client, db_session):
+    """
+    Ingesting an event refreshes the customer's `customer_health_stats` row, and
+    GET /api/customers/{id}/health serves that row's factors and score while it is fresh.
+
+    Flow:
+    1) POST a feature_used event -> the stats row exists with one distinct feature
+       and its factor scores / health score already computed.
+    2) Overwrite the row's stored factor directly (still fresh) -> health reflects the
+       row, proving the endpoint reads the materialized scores instead of raw activity.
+    3) Bump the customer's data_version without refreshing the row (a write the row
+       does not reflect) -> health recomputes from raw activity, however recent the row.
+    4) Age the row past the max age -> health recomputes from raw activity.
+    """
+    c = Customer(name="StatsCo", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+
+    res = client.post(
+        f"/api/customers/{c.id}/events",
+        json={"type": "feature_used", "meta": {"feature_name": "Analytics"}},
+    )
+    assert res.status_code == 201
+
+    stats = db_session.get(CustomerHealthStats, c.id)
+    db_session.refresh(stats)
+    assert stats.distinct_features_90d == 1
+    assert stats.logins_30d == 0
+    assert stats.feature_adoption == 20.0
+    assert stats.data_version == db_session.get(Customer, c.id).data_version == 1
+    assert stats.health_score == client.get(f"/api/customers/{c.id}/health").json()["healthScore"]
+
+    health_cache.clear()
+    stats.login_frequency = 100.0
+    db_session.commit()
+    assert client.get(f"/api/customers/{c.id}/health").json()["factors"]["loginFrequency"] == 100.0
+
+    stats.login_frequency = 100.0
+    db_session.get(Customer, c.id).data_version = 2
+    db_session.commit()
+    assert client.get(f"/api/customers/{c.id}/health").json()["factors"]["loginFrequency"] == 0.0
+    db_session.refresh(stats)
+    assert stats.data_version == 2
+
+    health_cache.clear()
+    stats.login_frequency = 100.0
+    db_session.commit()
+    assert client.get(f"/api/customers/{c.id}/health").json()["factors"]["loginFrequency"] == 100.0
+
+    health_cache.clear()
+    stats.updated_at = datetime.utcnow() - STATS_MAX_AGE - timedelta(minutes=1)
+    db_session.commit()
+    assert client.get(f"/api/customers/{c.id}/health").json()["factors"]["loginFrequency"] == 0.0
+
+
+def test_invoice_timeliness_counts_unpaid_as_not_on_time(client, db_session):
+    """
+    Invoice timeliness comes from one FILTERed aggregate (on-time vs total).
+
+    An unpaid invoice (paid_date NULL) must count towards the total but not as
+    on time, on both the single-customer and the batch path.
+    """
+    c = Customer(name="UnpaidCo", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+
+    due = datetime.utcnow() - timedelta(days=10)
+    db_session.add_all([
+        Invoice(customer_id=c.id, due_date=due, paid_date=due - timedelta(days=1), amount=50.0),
+        Invoice(customer_id=c.id, due_date=due, paid_date=due + timedelta(days=3), amount=50.0),
+        Invoice(customer_id=c.id, due_date=due, paid_date=None, amount=50.0),
+        Invoice(customer_id=c.id, due_date=due, paid_date=due, amount=50.0),
+    ])
+    db_session.commit()
+
+    single = client.get(f"/api/customers/{c.id}/health").json()
+    health_cache.clear()
+    batch = client.get(f"/api/health?ids={c.id}").json()[0]
+    assert single["factors"]["invoiceTimeliness"] == 50.0   # 2 of 4
+    assert batch["factors"]["invoiceTimeliness"] == 50.0
+
+
+def test_feature_adoption_counts_distinct_key_features_only(client, db_session):
+    """
+    Feature adoption counts each *key* feature once, whatever its usage volume,
+    and ignores feature names outside KEY_FEATURES.
+    """
+    c = Customer(name="FeatureCo", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+
+    used_at = datetime.utcnow() - timedelta(days=3)
+    db_session.add_all(
+        [FeatureUsage(customer_id=c.id, feature_name="Billing", used_at=used_at) for _ in range(4)]
+        + [FeatureUsage(customer_id=c.id, feature_name="Automation", used_at=used_at)]
+        + [FeatureUsage(customer_id=c.id, feature_name="LegacyExport", used_at=used_at)]
+    )
+    db_session.commit()
+
+    single = client.get(f"/api/customers/{c.id}/health").json()
+    health_cache.clear()
+    batch = client.get(f"/api/health?ids={c.id}").json()[0]
+    assert single["factors"]["featureAdoption"] == 40.0   # 2 of 5 key features
+    assert batch["factors"]["featureAdoption"] == 40.0
+
+
+def test_signals_soa_columns_align_by_customer(db_session):
+    """
+    fetch_signals_soa returns row-aligned NumPy columns, for a list of ids or
+    (ids=None) for every customer; unknown ids are absent and empty input is fine.
+    """
+    a = Customer(name="SoaA", segment="SMB", health_score=0.0)
+    b = Customer(name="SoaB", segment="SMB", health_score=0.0)
+    db_session.add_all([a, b])
+    db_session.commit()
+    now = datetime.utcnow()
+    db_session.add_all([
+        Event(customer_id=b.id, type="login", timestamp=now - timedelta(days=1)),
+        Event(customer_id=b.id, type="login", timestamp=now - timedelta(days=2)),
+        SupportTicket(customer_id=a.id, status="open", created_at=now - timedelta(days=5)),
+    ])
+    db_session.commit()
+
+    every = fetch_signals_soa(db_session, None, now)
+    by_id = dict(zip(every["customer_id"].tolist(), zip(every["logins_30d"].tolist(), every["tickets_90d"].tolist())))
+    assert by_id == {a.id: (0, 1), b.id: (2, 0)}
+
+    some = fetch_signals_soa(db_session, [b.id, 999999], now)
+    assert some["customer_id"].tolist() == [b.id]
+    assert some["name"].tolist() == ["SoaB"]
+
+    assert len(fetch_signals_soa(db_session, [], now)["logins_30d"]) == 0
+
+
+def test_refresh_all_health_stats_matches_single_endpoint(client, db_session):
+    """
+    The periodic bulk refresh materializes every customer's counts, factors and
+    score, and a fresh row read back through the single endpoint gives the same
+    breakdown a from-scratch computation does.
+    """
+    a = Customer(name="RefreshA", segment="SMB", health_score=0.0)
+    b = Customer(name="RefreshB", segment="SMB", health_score=0.0)
+    db_session.add_all([a, b])
+    db_session.commit()
+    now = datetime.utcnow()
+    db_session.execute(insert(Event), [
+        {"customer_id": a.id, "type": "login", "timestamp": now - timedelta(days=1)},
+    ] * 5)
+    db_session.add(Invoice(customer_id=b.id, due_date=now, paid_date=now, amount=1.0))
+    db_session.commit()
+
+    # Without a stats row the endpoint computes from raw activity
+    expected = {cid: client.get(f"/api/customers/{cid}/health").json() for cid in (a.id, b.id)}
+    db_session.query(CustomerHealthStats).delete()
+    db_session.commit()
+    health_cache.clear()
+
+    assert refresh_all_health_stats(db_session, now) == 2
+    db_session.commit()
+
+    stats_a = db_session.get(CustomerHealthStats, a.id)
+    assert stats_a.logins_30d == 5
+    assert stats_a.health_score == expected[a.id]["healthScore"]
+    for cid in (a.id, b.id):
+        assert client.get(f"/api/customers/{cid}/health").json() == expected[cid]
+
+
+def test_refresh_all_health_stats_keeps_newer_rows(db_session):
+    """
+    A bulk refresh started before an ingest must not overwrite the row that ingest
+    wrote: a stats row with a later `updated_at` is left untouched.
+    """
+    c = Customer(name="RefreshRace", segment="SMB", health_score=0.0)
+    db_session.add(c)
+    db_session.commit()
+    started = datetime.utcnow()
+    db_session.add(CustomerHealthStats(customer_id=c.id, logins_30d=7, updated_at=started + timedelta(seconds=5)))
+    db_session.commit()
+
+    refresh_all_health_stats(db_session, started)
+    db_session.commit()
+    db_session.expire_all()
+
+    stats = db_session.get(CustomerHealthStats, c.id)
+    assert stats.logins_30d == 7
+    assert stats.updated_at == started + timedelta(seconds=5)
+
+
+def test_session_middleware_shares_one_session_per_request(test_engine, monkeypatch):
+    """
+    Through the real `SessionMiddleware` and `get_db` (no dependency override):
+    every `get_db` dependency in a request gets the same session, which is closed
+    once the response is sent; outside a request, `get_db` opens a private
+    session and closes it itself.
+    """
+    opened = []
+
+    class TrackedSession(Session):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def session_factory():
+        session = TrackedSession(bind=test_engine)
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(db_module, "SessionLocal", session_factory)
+
+    def nested(db: Session = Depends(db_module.get_db)):
+        return db
+
+    app = FastAPI()
+    app.add_middleware(db_module.SessionMiddleware)
+
+    @app.get("/sessions")
+    def sessions(db: Session = Depends(db_module.get_db), other: Session = Depends(nested)):
+        assert not db.closed
+        return {"same": db is other, "index": opened.index(db)}
+
+    with TestClient(app) as c:
+        assert c.get("/sessions").json() == {"same": True, "index": 0}
+        assert c.get("/sessions").json() == {"same": True, "index": 1}
+    assert len(opened) == 2 and all(s.closed for s in opened)
+
+    # No request context: a private session, closed when the generator finishes
+    gen = db_module.get_db()
+    private = next(gen)
+    assert private is opened[2] and not private.closed
+    gen.close()
+    assert private.closed
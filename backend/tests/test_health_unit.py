@@ -14,6 +14,9 @@ These tests focus on pure functions (no I/O), so failures indicate logic issues,
 not infrastructure problems.
 """
 
+import numpy as np
+import pytest
+
 from backend.services.health import (
     score_login_frequency,
     score_feature_adoption,
@@ -21,7 +24,17 @@ from backend.services.health import (
     score_invoice_timeliness_counts,
     score_invoice_timeliness_ratio,
     score_api_trend,
+    compute_factors,
     weighted_score,
+    _weighted_score_generic,
+    weighted_scores_batch,
+    score_login_frequency_vec,
+    score_feature_adoption_vec,
+    score_support_load_vec,
+    score_invoice_timeliness_counts_vec,
+    score_api_trend_vec,
+    score_factor_matrix,
+    FACTOR_KEYS,
     WEIGHTS,
 )
 
@@ -129,3 +142,103 @@ def test_weighted_score_basic():
     )
     # Round to match the function's 2-decimal behavior
     assert round(expected, 2) == score
+    # The generated, weights-inlined function agrees with the reference loop
+    assert score == _weighted_score_generic(factors)
+    assert weighted_score({}) == _weighted_score_generic({}) == 0.0
+
+
+def test_array_scorers_match_weighted_score():
+    """
+    `weighted_scores_batch` takes a factor matrix with columns in FACTOR_KEYS order
+    (as laid out by `score_factor_matrix`) and agrees with the dict-based
+    `weighted_score` row by row.
+    """
+    rows = [
+        {"loginFrequency": 60.0, "featureAdoption": 40.0, "supportLoad": 80.0, "invoiceTimeliness": 100.0, "apiTrend": 55.0},
+        {"loginFrequency": 0.0, "featureAdoption": 100.0, "supportLoad": 10.0, "invoiceTimeliness": 50.0, "apiTrend": 33.33},
+    ]
+    matrix = np.array([[row[k] for k in FACTOR_KEYS] for row in rows])
+    assert weighted_scores_batch(matrix).tolist() == [weighted_score(row) for row in rows]
+
+
+def test_batch_weighted_score_rounds_like_scalar_on_half_cent():
+    """
+    A weighted sum landing next to .xx5 rounds the same way in the batch and scalar
+    paths (terms are added in the same order; a dot product would give 60.87).
+    """
+    row = {"loginFrequency": 25.0, "featureAdoption": 100.0, "supportLoad": 0.0, "invoiceTimeliness": 100.0, "apiTrend": 64.1}
+    matrix = np.array([[row[k] for k in FACTOR_KEYS]])
+    assert weighted_score(row) == 60.86
+    assert weighted_scores_batch(matrix).tolist() == [60.86]
+
+
+def test_vector_scorers_match_scalar_scorers():
+    """
+    Each `*_vec` scorer applied to an array of counts gives the same values as the
+    scalar scorer applied element by element (including clamping and the
+    neutral-50 cases), so batch and single-customer breakdowns agree.
+    """
+    counts = np.arange(0, 25, dtype=np.float64)
+    other = counts[::-1].copy()
+
+    assert score_login_frequency_vec(counts).tolist() == [score_login_frequency(int(c)) for c in counts]
+    assert score_feature_adoption_vec(counts).tolist() == [score_feature_adoption(int(c)) for c in counts]
+    assert score_feature_adoption_vec(counts, total_features=0).tolist() == [50.0] * len(counts)
+    assert score_support_load_vec(counts).tolist() == [score_support_load(int(c)) for c in counts]
+
+    on_time = np.minimum(counts, other)
+    assert score_invoice_timeliness_counts_vec(on_time, other).tolist() == [
+        score_invoice_timeliness_counts(int(a), int(b)) for a, b in zip(on_time, other)
+    ]
+    assert score_api_trend_vec(counts, other).tolist() == pytest.approx(
+        [score_api_trend(int(a), int(b)) for a, b in zip(counts, other)], abs=0.01
+    )
+
+
+def test_factor_matrix_matches_scalar_scorers():
+    """
+    `score_factor_matrix` (Numba kernel when available, NumPy otherwise) returns
+    one row per customer equal to the five scalar scores in FACTOR_KEYS order.
+    """
+    rng = np.random.default_rng(7)
+    logins, feats, tickets, total, curr, prev = (rng.integers(0, 30, 50) for _ in range(6))
+    on_time = np.minimum(rng.integers(0, 30, 50), total)
+
+    matrix = score_factor_matrix(logins, feats, tickets, on_time, total, curr, prev)
+    expected = [
+        [
+            score_login_frequency(int(l)),
+            score_feature_adoption(int(f)),
+            score_support_load(int(t)),
+            score_invoice_timeliness_counts(int(o), int(n)),
+            score_api_trend(int(c), int(p)),
+        ]
+        for l, f, t, o, n, c, p in zip(logins, feats, tickets, on_time, total, curr, prev)
+    ]
+    assert matrix.shape == (50, len(FACTOR_KEYS))
+    assert matrix == pytest.approx(np.array(expected), abs=0.01)
+
+
+def test_compute_factors_matches_individual_scorers():
+    """
+    The fused `compute_factors` used by the health endpoint returns exactly what
+    the five individual scorers return with their default targets.
+    """
+    for n in range(0, 30, 3):
+        m = 29 - n
+        fused = compute_factors(
+            logins_30d=n,
+            distinct_features_90d=n % 7,
+            tickets_90d=m,
+            invoices_on_time=min(n, m),
+            invoices_total=m if n % 2 else 0,
+            api_30d=n,
+            api_prev_30d=m,
+        )
+        assert fused == {
+            "loginFrequency": score_login_frequency(n),
+            "featureAdoption": score_feature_adoption(n % 7),
+            "supportLoad": score_support_load(m),
+            "invoiceTimeliness": score_invoice_timeliness_counts(min(n, m), m if n % 2 else 0),
+            "apiTrend": score_api_trend(n, m),
+        }
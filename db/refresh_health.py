@@ -0,0 +1,41 @@
+# db/refresh_health.py
+"""
+Recompute the materialized health of every customer (`customer_health_stats`).
+
+Ingest keeps the row of the customer it writes for up to date; this job moves the
+rolling 30/60/90-day windows forward for everyone else, so the health endpoint
+keeps serving fresh rows instead of recomputing on read. Run it periodically
+(e.g. nightly from cron):
+
+    python db/refresh_health.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# --- Add backend/ to sys.path so we can import models & DB session ---
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# A full-table aggregate legitimately outlasts the API's per-statement guard
+os.environ.setdefault("DB_STATEMENT_TIMEOUT_MS", "0")
+os.environ.setdefault("DB_IDLE_TX_TIMEOUT_MS", "0")
+os.environ.setdefault("DB_APPLICATION_NAME", "health_refresh")
+
+from backend.db import Base, engine, SessionLocal, create_missing_columns
+from backend.models import utcnow
+from backend.services.signals import refresh_all_health_stats
+
+
+def main() -> None:
+    Base.metadata.create_all(bind=engine)
+    create_missing_columns()
+    with SessionLocal() as session:
+        refreshed = refresh_all_health_stats(session, utcnow())
+        session.commit()
+    print(f"Refreshed health for {refreshed} customers.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,50 @@
 Populate the development DB with *realistic & correlated* SaaS usage so health scores
 spread across healthy / at-risk / churn-risk segments.
 
-Key changes:
+Data model:
 - Segment-aware personas (enterprise / SMB / startup × healthy / at-risk / churn-risk)
 - Correlated factors (adoption ↔ logins ↔ API; enterprise yields more tickets, etc.)
 - Explicit API trend (prev30d vs curr30d means)
 - 4 invoice cycles (3+ months), realistic on-time ratios per persona
+
+Loading: each child table is bulk-loaded once (COPY on Postgres); events are
+streamed into the load as they are generated. See `parse_args` for
+--fast-seed / --in-db and the MAX_SEED_THREADS env var.
+
+Usage:
+    python db/seed.py --customers 80 [--reset] [--seed 42] [--fast-seed] [--in-db]
 """
 
 import argparse
+import csv
+import io
+import json
 import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, text
 
 # --- Add backend/ to sys.path so we can import models & DB session ---
+import os
 import sys
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
-from backend.db import Base, engine, SessionLocal
-from backend.models import Customer, Event, Invoice, SupportTicket, FeatureUsage
+# Bulk inserts legitimately outlast the API's per-statement guard; disable the
+# server-side timeouts for this process unless explicitly configured.
+os.environ.setdefault("DB_STATEMENT_TIMEOUT_MS", "0")
+os.environ.setdefault("DB_IDLE_TX_TIMEOUT_MS", "0")
+os.environ.setdefault("DB_APPLICATION_NAME", "health_seed")
+
+from backend.db import Base, engine, SessionLocal, DB_POOL_SIZE, DB_MAX_OVERFLOW, create_missing_columns, create_missing_indexes
+from backend.models import Customer, CustomerHealthStats, Event, Invoice, SupportTicket, FeatureUsage, utcnow
+from backend.services.health import KEY_FEATURES
 
 try:
     from faker import Faker
@@ -33,8 +56,32 @@ except ImportError:
 fake = Faker()
 
 SEGMENTS = ["enterprise", "SMB", "startup"]
-FEATURES = ["Billing", "Analytics", "Automation", "Integrations", "Collaboration"]
+FEATURES = list(KEY_FEATURES)  # the features the health score counts
+# Every subset of FEATURES (as a bitmask over its indexes), grouped by size:
+# SUBSETS_BY_POPCOUNT[k] lists all k-feature subsets, so a uniform k-subset is one choice()
+SUBSETS_BY_POPCOUNT: List[List[Tuple[str, ...]]] = [[] for _ in range(len(FEATURES) + 1)]
+for _mask in range(1 << len(FEATURES)):
+    SUBSETS_BY_POPCOUNT[bin(_mask).count("1")].append(
+        tuple(f for i, f in enumerate(FEATURES) if _mask >> i & 1)
+    )
 INVOICE_MONTHS = 4  # 3+ months as requested
+API_ENDPOINTS = ["/v1/items", "/v1/search", "/v1/ingest", "/v1/analytics"]
+# One shared meta dict per endpoint (api_call rows reference these, never copies),
+# and its JSON text serialized once for COPY
+ENDPOINT_METAS = [{"endpoint": e} for e in API_ENDPOINTS]
+_META_JSON = {id(m): json.dumps(m) for m in ENDPOINT_METAS}
+NAME_POOL_SIZE = 500  # distinct Faker company names per run
+# Rows per INSERT executemany on the non-COPY path, and per CSV encode when streaming
+# COPY (bounded memory per statement / read)
+INSERT_CHUNK_ROWS = 5000
+# Tables bulk-loaded concurrently, one pooled connection each (1 = serial)
+MAX_SEED_THREADS = int(os.getenv("MAX_SEED_THREADS", "4"))
+
+# Column order of the row tuples the seed_* functions emit (and of the COPY lists)
+EVENT_COLUMNS = ("customer_id", "type", "timestamp", "meta")
+FEATURE_USAGE_COLUMNS = ("customer_id", "feature_name", "used_at")
+TICKET_COLUMNS = ("customer_id", "status", "created_at")
+INVOICE_COLUMNS = ("customer_id", "due_date", "paid_date", "amount")
 
 # ----------------------------
 # Persona model (domain-driven)
@@ -49,6 +96,18 @@ class Persona:
     tickets_90:       Tuple[int, int]     # support tickets opened in last 90d
     ontime_prob:      Tuple[float, float] # per-invoice on-time probability
 
+@dataclass(frozen=True)
+class CustomerPlan:
+    """One customer's activity parameters, sampled once from its Persona."""
+    label:             str    # healthy | at_risk | churn_risk
+    login_mu_per_day:  float
+    api_prev30_mu:     int    # API means per 30 days: previous, middle, current
+    api_mid30_mu:      int    # halfway between prev and curr
+    api_curr30_mu:     int    # prev * trend_ratio
+    distinct_features: int    # distinct features used in last 90d
+    tickets:           int    # support tickets opened in last 90d
+    ontime_p:          float  # per-invoice on-time probability
+
 # Segment × health personas
 PERSONAS = {
     "enterprise": {
@@ -75,6 +134,14 @@ PERSONA_WEIGHTS = {
     "startup":    [0.45, 0.35, 0.20],
 }
 
+# Flattened lookup for the per-customer hot path (segments/labels are fixed, 3×3):
+# PERSONA_TABLE[segment_id][label_id] and PERSONA_WEIGHT_TABLE[segment_id]
+PERSONA_LABELS = ("healthy", "at_risk", "churn_risk")
+SEGMENT_ID = {seg: i for i, seg in enumerate(SEGMENTS)}
+PERSONA_TABLE = tuple(tuple(PERSONAS[seg][label] for label in PERSONA_LABELS) for seg in SEGMENTS)
+PERSONA_WEIGHT_TABLE = tuple(PERSONA_WEIGHTS[seg] for seg in SEGMENTS)
+_LABEL_IDS = range(len(PERSONA_LABELS))
+
 def parse_args() -> argparse.Namespace:
     """
     Parse command-line arguments.
@@ -84,11 +151,17 @@ def parse_args() -> argparse.Namespace:
             customers (int): number of customers to create (min 50 by logic).
             reset (bool):    if True, drop & recreate tables before seeding.
             seed (int|None): RNG/Faker seed for reproducibility.
+            fast_seed (bool): if True, load child tables without their secondary indexes.
+            in_db (bool):    if True (Postgres), generate events inside the database.
     """
     p = argparse.ArgumentParser(description="Seed Postgres with realistic CORRELATED data.")
     p.add_argument("--customers", type=int, default=60)
     p.add_argument("--reset", action="store_true")
     p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--fast-seed", action="store_true",
+                   help="drop the child tables' secondary indexes during the load and rebuild them after")
+    p.add_argument("--in-db", action="store_true",
+                   help="Postgres only: generate login/API events server-side with generate_series")
     return p.parse_args()
 
 def reset_db() -> None:
@@ -97,62 +170,96 @@ def reset_db() -> None:
     Base.metadata.create_all(bind=engine)
 
 def ensure_tables() -> None:
-    """Create tables if they do not exist (idempotent)."""
+    """Create tables if they do not exist and add columns they are missing (idempotent)."""
     Base.metadata.create_all(bind=engine)
+    create_missing_columns()
 
-def daterange_days(days_back: int) -> List[datetime]:
+def drop_bulk_indexes() -> None:
+    """
+    Drop the secondary (model-declared) indexes of the bulk-loaded child tables.
+
+    Building an index once over the loaded rows is much cheaper than maintaining it
+    row by row during the load. Primary keys and foreign keys are kept.
+    Pair with `create_missing_indexes()` afterwards.
+    """
+    for model in (Event, FeatureUsage, SupportTicket, Invoice):
+        for index in model.__table__.indexes:
+            index.drop(bind=engine, checkfirst=True)
+
+def daterange_days(days_back: int, now: Optional[datetime] = None) -> List[datetime]:
     """
     Build a list of day timestamps from (now - days_back) → now.
 
     Example:
         daterange_days(2) -> [T-2d, T-1d, T]
     """
-    now = datetime.utcnow()
+    now = now or utcnow()
     return [now - timedelta(days=i) for i in range(days_back, -1, -1)]
 
+# Activity window within a day: 07:00:00–21:59:59 (avoids midnight-heavy spikes)
+ACTIVE_FROM_HOUR = 7
+ACTIVE_SECONDS = 15 * 3600
+
+def active_start(day: datetime) -> datetime:
+    """Start of the activity window (07:00:00) on the given day."""
+    return day.replace(hour=ACTIVE_FROM_HOUR, minute=0, second=0)
+
 def rnd_dt_in_day(day: datetime) -> datetime:
     """
     Pick a random timestamp within a given day (07:00–21:59 to avoid midnight-heavy spikes).
+
+    One `randrange` over the window's seconds; hot loops that stamp many rows on
+    the same day precompute `active_start(day)` and add the offset themselves.
     """
-    return day.replace(
-        hour=random.randint(7, 21), minute=random.randint(0, 59), second=random.randint(0, 59)
-    )
+    return active_start(day) + timedelta(seconds=random.randrange(ACTIVE_SECONDS))
 
-def new_customer() -> Customer:
+def activity_starts(now: datetime, days_back: int = 90) -> np.ndarray:
     """
-    Create a new Customer with a random segment and reasonable created_at.
+    Activity-window start of each of the last `days_back`+1 days, oldest first, as
+    datetime64[us]. Identical for every customer, so main() builds it once per run.
+    """
+    return np.array([active_start(day) for day in daterange_days(days_back, now)], dtype="datetime64[us]")
+
+def company_names(count: int) -> List[str]:
+    """
+    `count` company names. Faker is slow per call, so at most NAME_POOL_SIZE names
+    are generated and larger runs draw the rest from that pool (names need not be unique).
+    """
+    pool = [fake.company() for _ in range(min(count, NAME_POOL_SIZE))]
+    return pool + random.choices(pool, k=count - len(pool))
+
+def created_ats(count: int, now: datetime) -> List[datetime]:
+    """`count` signup timestamps uniform over the year before `now` (one NumPy draw)."""
+    offsets = np.random.randint(0, 365 * 86400, count).astype("timedelta64[s]")
+    return (np.datetime64(now, "us") - offsets).tolist()
+
+def new_customer(name: str, created_at: datetime) -> Customer:
+    """
+    Create a new Customer with a random segment and the given name / created_at.
 
     Returns:
         Customer.
     """
     seg = random.choices(SEGMENTS, weights=[0.35, 0.45, 0.20], k=1)[0]
     return Customer(
-        name=fake.company(),
+        name=name,
         segment=seg,
         health_score=0.0,
-        created_at=fake.date_time_between(start_date="-1y", end_date="now"),
+        created_at=created_at,
     )
 
-def choose_persona(segment: str) -> Tuple[str, Persona]:
-    """
-    Pick a health persona label and Persona object for the given segment.
-
-    Returns:
-        (label, persona): e.g., ("at_risk", PERSONAS["SMB"]["at_risk"])
-    """
-    label = random.choices(["healthy", "at_risk", "churn_risk"], weights=PERSONA_WEIGHTS[segment], k=1)[0]
-    return label, PERSONAS[segment][label]
-
-def seed_customers(session, count: int) -> list:
+def seed_customers(session, count: int, now: datetime) -> list:
     """
-    Persist `count` new customers and return the list.
+    Persist `count` new customers (created within the year before `now`) and return the list.
 
-    Commits:
-        Inserts all customers in one transaction.
+    Flushes (does not commit): the caller decides where the seed transaction ends.
+    The flush is sent as batched `INSERT ... VALUES (...), (...) RETURNING id`
+    statements (see backend/db.py), so the generated ids are populated without one
+    round trip per customer.
     """
-    customers = [new_customer() for _ in range(count)]
+    customers = [new_customer(n, t) for n, t in zip(company_names(count), created_ats(count, now))]
     session.add_all(customers)
-    session.commit()
+    session.flush()
     return customers
 
 def _sample_int(lo_hi: Tuple[int, int]) -> int:
@@ -163,104 +270,108 @@ def _sample_float(lo_hi: Tuple[float, float]) -> float:
     lo, hi = lo_hi
     return random.uniform(lo, hi)
 
-def seed_logins_and_api_calls(session, customer_id: int, persona: Persona) -> None:
-    """
-    Build ~90 days of events.
-    - Logins: daily Poisson-like counts around a per-30d mean.
-    - API: explicit prev30d mean, curr30d mean = prev * trend_ratio.
+def choose_persona(segment: str) -> CustomerPlan:
     """
-    days = daterange_days(90)
-    events: List[Event] = []
+    Pick a health persona for the given segment and sample the customer's plan from it.
 
-    # --- login intensity over 90d ---
+    Every persona range is drawn here, once, so the seed_* emitters only read plain
+    numbers from the plan.
+
+    Returns:
+        CustomerPlan, e.g. label "at_risk" with values drawn from PERSONAS["SMB"]["at_risk"].
+    """
+    segment_id = SEGMENT_ID[segment]
+    label_id = random.choices(_LABEL_IDS, weights=PERSONA_WEIGHT_TABLE[segment_id], k=1)[0]
+    persona = PERSONA_TABLE[segment_id][label_id]
     logins_mu_30 = _sample_int(persona.logins_per_30_mu)
-    login_mu_per_day = max(0.0, logins_mu_30 / 30.0)
+    api_prev30_mu = _sample_int(persona.api_prev30_mu)
+    api_curr30_mu = int(api_prev30_mu * _sample_float(persona.api_trend_ratio))
+    return CustomerPlan(
+        label=PERSONA_LABELS[label_id],
+        login_mu_per_day=max(0.0, logins_mu_30 / 30.0),
+        api_prev30_mu=api_prev30_mu,
+        api_mid30_mu=int((api_prev30_mu + api_curr30_mu) / 2),
+        api_curr30_mu=api_curr30_mu,
+        distinct_features=_sample_int(persona.features_used_90),
+        tickets=_sample_int(persona.tickets_90),
+        ontime_p=_sample_float(persona.ontime_prob),
+    )
 
-    for day in days:
-        # 60% of days see logins; draw small counts around mean
-        if random.random() < 0.6 and login_mu_per_day > 0:
-            count = max(0, int(random.gauss(mu=login_mu_per_day, sigma=0.8)))
-            for _ in range(count):
-                events.append(Event(
-                    customer_id=customer_id, type="login", timestamp=rnd_dt_in_day(day), meta=None
-                ))
+def _stamps_per_day(starts: np.ndarray, mu_daily, sigma: float, p_active: float) -> List[datetime]:
+    """
+    Vectorized daily activity: each day is active with probability `p_active`; an
+    active day gets max(0, int(N(mu_daily, sigma))) events (`mu_daily` may be a
+    scalar or one mean per day). Returns one timestamp per event, in day order.
+    """
+    n = len(starts)
+    noisy = np.maximum(np.trunc(np.random.normal(mu_daily, sigma, n)), 0)
+    active = (np.random.random_sample(n) < p_active) & (np.asarray(mu_daily) > 0)
+    counts = np.where(active, noisy, 0).astype(np.int64)
+    day_idx = np.repeat(np.arange(n), counts)
+    secs = np.random.randint(0, ACTIVE_SECONDS, day_idx.size).astype("timedelta64[s]")
+    return (starts[day_idx] + secs).tolist()
+
+def seed_logins_and_api_calls(customer_id: int, plan: CustomerPlan, starts: np.ndarray) -> List[tuple]:
+    """
+    Build ~90 days of event rows (EVENT_COLUMNS order).
+    - Logins: daily Poisson-like counts around a per-30d mean.
+    - API: explicit prev30d mean, curr30d mean = prev * trend_ratio.
+
+    Day counts and timestamps are drawn with NumPy for all days at once;
+    `starts` comes from `activity_starts` (shared by all customers).
+    """
+    # --- login intensity over 90d: 60% of days see logins, small counts around mean ---
+    logins = _stamps_per_day(starts, plan.login_mu_per_day, sigma=0.8, p_active=0.6)
 
     # --- API trend: previous 30 vs current 30 ---
-    api_prev30_mu = _sample_int(persona.api_prev30_mu)
-    ratio = _sample_float(persona.api_trend_ratio)
-    api_curr30_mu = int(api_prev30_mu * ratio)
-    api_mid30_mu  = int((api_prev30_mu + api_curr30_mu) / 2)
-
-    # Slice days into [0..29]=prev, [30..59]=mid, [60..89]=curr (from oldest to newest)
-    prev_slice = days[:30]
-    mid_slice  = days[30:60]
-    curr_slice = days[60:]
-
-    def _emit_api(slice_days: List[datetime], mu_per_30: int):
-        mu_daily = max(0.0, mu_per_30 / 30.0)
-        for day in slice_days:
-            # 90% of days have API activity
-            if random.random() < 0.9 and mu_daily > 0:
-                count = max(0, int(random.gauss(mu=mu_daily, sigma=5)))
-                for _ in range(count):
-                    events.append(Event(
-                        customer_id=customer_id,
-                        type="api_call",
-                        timestamp=rnd_dt_in_day(day),
-                        meta={"endpoint": random.choice(["/v1/items", "/v1/search", "/v1/ingest", "/v1/analytics"])}
-                    ))
-    _emit_api(prev_slice, api_prev30_mu)
-    _emit_api(mid_slice,  api_mid30_mu)
-    _emit_api(curr_slice, api_curr30_mu)
-
-    if events:
-        session.bulk_save_objects(events)
-        session.commit()
+    # Days [0..29]=prev, [30..59]=mid, [60..90]=curr (from oldest to newest); 90% of days active
+    api_mu_daily = np.repeat(np.array([plan.api_prev30_mu, plan.api_mid30_mu, plan.api_curr30_mu]) / 30.0, [30, 30, len(starts) - 60])
+    api_calls = _stamps_per_day(starts, api_mu_daily, sigma=5, p_active=0.9)
+
+    events: List[tuple] = [(customer_id, "login", ts, None) for ts in logins]
+    metas = random.choices(ENDPOINT_METAS, k=len(api_calls))
+    events.extend((customer_id, "api_call", ts, meta) for ts, meta in zip(api_calls, metas))
+    return events
 
-def seed_feature_usage(session, customer_id: int, persona: Persona) -> None:
+def seed_feature_usage(customer_id: int, plan: CustomerPlan, now: datetime) -> List[tuple]:
     """
-    Emit feature usage rows over the last 90 days.
+    Emit feature usage rows (FEATURE_USAGE_COLUMNS order) over the last 90 days.
 
-    - Distinct features used is drawn from persona.features_used_90.
+    - Distinct features used is plan.distinct_features.
     - Each chosen feature gets 2–8 usage stamps at random days.
     """
-    distinct = _sample_int(persona.features_used_90)
+    distinct = plan.distinct_features
     if distinct <= 0:
-        return
-    used = random.sample(FEATURES, k=min(distinct, len(FEATURES)))
+        return []
+    used = random.choice(SUBSETS_BY_POPCOUNT[min(distinct, len(FEATURES))])
     rows = []
     for fname in used:
         for _ in range(random.randint(2, 8)):
-            day = datetime.utcnow() - timedelta(days=random.randint(0, 90))
-            rows.append(FeatureUsage(customer_id=customer_id, feature_name=fname, used_at=rnd_dt_in_day(day)))
-    if rows:
-        session.bulk_save_objects(rows)
-        session.commit()
+            day = now - timedelta(days=random.randint(0, 90))
+            rows.append((customer_id, fname, rnd_dt_in_day(day)))
+    return rows
 
-def seed_support_tickets(session, customer_id: int, persona: Persona) -> None:
+def seed_support_tickets(customer_id: int, plan: CustomerPlan, now: datetime) -> List[tuple]:
     """
-    Create support tickets over the last 90 days.
+    Create support ticket rows (TICKET_COLUMNS order) over the last 90 days.
 
-    - Ticket count drawn from persona.tickets_90.
+    - Ticket count is plan.tickets.
     - Status is sampled with a bias towards 'closed' (70%).
     """
-    count = _sample_int(persona.tickets_90)
-    rows: List[SupportTicket] = []
-    for _ in range(count):
-        created = datetime.utcnow() - timedelta(days=random.randint(0, 90))
-        status = random.choices(["open", "closed"], weights=[0.3, 0.7], k=1)[0]
-        rows.append(SupportTicket(customer_id=customer_id, status=status, created_at=rnd_dt_in_day(created)))
-    if rows:
-        session.bulk_save_objects(rows)
-        session.commit()
-
-def seed_invoices(session, customer_id: int, persona: Persona) -> None:
+    rows: List[tuple] = []
+    statuses = random.choices(["open", "closed"], weights=[0.3, 0.7], k=plan.tickets)
+    for status in statuses:
+        created = now - timedelta(days=random.randint(0, 90))
+        rows.append((customer_id, status, rnd_dt_in_day(created)))
+    return rows
+
+def seed_invoices(customer_id: int, plan: CustomerPlan, now: datetime) -> List[tuple]:
     """
-    4 recent invoices; each has on-time probability based on persona (late if paid > due).
+    4 recent invoice rows (INVOICE_COLUMNS order); each is on time with probability
+    plan.ontime_p (late if paid > due).
     """
-    now = datetime.utcnow()
-    rows: List[Invoice] = []
-    ontime_p = _sample_float(persona.ontime_prob)
+    rows: List[tuple] = []
+    ontime_p = plan.ontime_p
     for m in range(INVOICE_MONTHS):
         due = datetime(now.year, now.month, 1) - timedelta(days=30 * m)
         amount = round(random.uniform(200, 3000), 2)
@@ -269,10 +380,229 @@ def seed_invoices(session, customer_id: int, persona: Persona) -> None:
                 paid = due - timedelta(days=random.randint(0, 2))
             else:
                 paid = due + timedelta(days=random.randint(1, 25))
-            rows.append(Invoice(customer_id=customer_id, due_date=due, paid_date=paid, amount=amount))
-    if rows:
-        session.bulk_save_objects(rows)
+            rows.append((customer_id, due, paid, amount))
+    return rows
+
+def _csv_value(value):
+    """CSV cell for COPY: JSON columns as JSON text; None stays an unquoted empty cell (NULL)."""
+    if isinstance(value, dict):
+        cached = _META_JSON.get(id(value))
+        return cached if cached is not None else json.dumps(value)
+    return value
+
+class RowStream(io.RawIOBase):
+    """
+    Read-only binary file that CSV-encodes `rows` on demand, for `copy_expert`.
+
+    psycopg2 pulls the COPY payload with `read(size)`; each read encodes only as many
+    rows (INSERT_CHUNK_ROWS at a time) as it needs, so with a lazy `rows` iterable
+    memory stays at about one chunk however large the table is.
+    """
+
+    def __init__(self, rows: Iterable[tuple]) -> None:
+        self._rows = iter(rows)
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text)
+        self._pending = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while len(self._pending) < len(b):
+            batch = list(islice(self._rows, INSERT_CHUNK_ROWS))
+            if not batch:
+                break
+            self._writer.writerows(tuple(_csv_value(v) for v in row) for row in batch)
+            self._pending += self._text.getvalue().encode()
+            self._text.seek(0)
+            self._text.truncate()
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        del self._pending[:n]
+        return n
+
+def load_rows(session, table, columns: Sequence[str], rows: Iterable[tuple]) -> None:
+    """
+    Bulk-load `rows` (tuples in `columns` order) into `table` inside the session's transaction.
+
+    `rows` may be a lazy iterable: it is consumed once, in chunks, so rows can be
+    generated while they are loaded.
+
+    - Postgres: one `COPY ... FROM STDIN WITH (FORMAT CSV)` on the session's own
+      connection, the fastest ingestion path (no per-row statement or bind work;
+      faster than multi-VALUES `execute_values` pages, with no bind-parameter limit),
+      fed through a `RowStream`.
+    - Other backends (e.g. a local SQLite file): Core `insert(table)` executemany
+      with plain dicts (no ORM objects), INSERT_CHUNK_ROWS rows per call.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        cur = session.connection().connection.cursor()
+        try:
+            cur.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV)",
+                RowStream(rows),
+            )
+        finally:
+            cur.close()
+    else:
+        stmt = insert(table)
+        it = iter(rows)
+        while True:
+            chunk = [dict(zip(columns, row)) for row in islice(it, INSERT_CHUNK_ROWS)]
+            if not chunk:
+                break
+            session.execute(stmt, chunk)
+
+# Same distributions as seed_logins_and_api_calls, evaluated by Postgres: one row per
+# (customer, day offset 0..90) carries that day's count, generate_series(1, n) expands
+# it into n events. Gaussian noise is Box-Muller (random_normal() needs Postgres 16);
+# int() truncation is trunc(); timestamps fall in 07:00-21:59:59 like rnd_dt_in_day.
+# API means: offsets 61..90 are the previous 30 days, 31..60 the middle, 0..30 current.
+EVENTS_IN_DB_SQL = text("""
+WITH plan AS (
+    SELECT *
+    FROM unnest(
+        CAST(:customer_ids AS integer[]), CAST(:login_mu AS float8[]),
+        CAST(:api_prev AS integer[]), CAST(:api_mid AS integer[]), CAST(:api_curr AS integer[])
+    ) AS p(customer_id, login_mu, api_prev, api_mid, api_curr)
+),
+days AS (
+    SELECT p.*, g.offs, date_trunc('day', CAST(:now AS timestamp) - g.offs * interval '1 day') AS midnight
+    FROM plan p CROSS JOIN generate_series(0, 90) AS g(offs)
+),
+daily AS (
+    SELECT customer_id, midnight, 'login' AS type,
+           CASE WHEN random() < 0.6 AND login_mu > 0
+                THEN greatest(0, trunc(login_mu + 0.8 * sqrt(-2 * ln(1 - random())) * cos(2 * pi() * random())))
+                ELSE 0 END::int AS n
+    FROM days
+    UNION ALL
+    SELECT customer_id, midnight, 'api_call' AS type,
+           CASE WHEN random() < 0.9 AND m.mu > 0
+                THEN greatest(0, trunc(m.mu + 5 * sqrt(-2 * ln(1 - random())) * cos(2 * pi() * random())))
+                ELSE 0 END::int AS n
+    FROM days
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN offs > 60 THEN api_prev WHEN offs > 30 THEN api_mid ELSE api_curr END / 30.0 AS mu
+    ) AS m
+)
+INSERT INTO events (customer_id, type, timestamp, meta)
+SELECT d.customer_id,
+       d.type,
+       d.midnight + make_interval(secs => 25200 + floor(random() * 54000)),
+       CASE WHEN d.type = 'api_call' THEN jsonb_build_object(
+           'endpoint', (ARRAY['/v1/items', '/v1/search', '/v1/ingest', '/v1/analytics'])[1 + floor(random() * 4)::int]
+       ) END
+FROM daily d
+CROSS JOIN LATERAL generate_series(1, d.n)
+""")
+
+def seed_events_in_db(session, plans: List[Tuple[int, CustomerPlan]], now: datetime) -> None:
+    """
+    Generate every customer's login/API events inside Postgres with one INSERT ... SELECT.
+
+    Only the per-customer intensities (from each `CustomerPlan`) are sent from Python
+    as arrays; no event row crosses the network. Not committed here.
+    """
+    session.execute(EVENTS_IN_DB_SQL, {
+        "customer_ids": [cid for cid, _ in plans],
+        "login_mu": [plan.login_mu_per_day for _, plan in plans],
+        "api_prev": [plan.api_prev30_mu for _, plan in plans],
+        "api_mid": [plan.api_mid30_mu for _, plan in plans],
+        "api_curr": [plan.api_curr30_mu for _, plan in plans],
+        "now": now,
+    })
+
+def _load_table(table, columns: Sequence[str], rows: Iterable[tuple]) -> None:
+    """Worker: load one table on its own session/connection and commit it."""
+    session = SessionLocal()
+    try:
+        load_rows(session, table, columns, rows)
+        session.commit()
+    finally:
+        # Return the connection to the pool even on failure
+        session.close()
+
+def discard_customers(customer_ids: List[int]) -> None:
+    """
+    Delete the given customers and every row that references them, in one transaction.
+
+    Used to undo a threaded seed that failed after its customers were committed, so a
+    half-seeded database is never left behind (the entrypoint would skip reseeding it).
+    The model cascades are ORM-only, so children are deleted explicitly first.
+    """
+    with SessionLocal() as session:
+        for model in (Event, FeatureUsage, SupportTicket, Invoice, CustomerHealthStats):
+            session.execute(delete(model).where(model.customer_id.in_(customer_ids)))
+        session.execute(delete(Customer).where(Customer.id.in_(customer_ids)))
+        session.commit()
+
+def seed_worker_count(jobs: int) -> int:
+    """
+    Threads for the table loads: MAX_SEED_THREADS, capped by the job count and by
+    what the engine pool can hand out. Loads are I/O bound (psycopg2 releases the
+    GIL during COPY), so threads overlap them. Non-Postgres backends load serially
+    (SQLite allows a single writer).
+    """
+    if engine.dialect.name != "postgresql":
+        return 1
+    return max(1, min(MAX_SEED_THREADS, jobs, DB_POOL_SIZE + DB_MAX_OVERFLOW))
+
+def load_activity(session, customers: List[Customer], now: datetime, in_db: bool) -> None:
+    """
+    Generate every customer's activity and bulk-load each child table once.
+
+    The small tables (feature usage, tickets, invoices) are built in memory; events,
+    the bulk of the data, are generated customer by customer while the load
+    consumes them, so memory stays bounded for large --customers runs. With `in_db`,
+    login/API events are generated by Postgres instead (`seed_events_in_db`).
+    Commits: a single commit when loading serially; with worker threads, the
+    customers first, then each table on its own connection (if any load fails, the
+    run's customers and their rows are deleted again before the error propagates).
+    """
+    starts = activity_starts(now)
+    plans: List[Tuple[int, CustomerPlan]] = [(c.id, choose_persona(c.segment)) for c in customers]
+    usage: List[tuple] = []
+    tickets: List[tuple] = []
+    invoices: List[tuple] = []
+    for cid, plan in plans:
+        usage.extend(seed_feature_usage(cid, plan, now))
+        tickets.extend(seed_support_tickets(cid, plan, now))
+        invoices.extend(seed_invoices(cid, plan, now))
+    events: Iterator[tuple] = iter(()) if in_db else chain.from_iterable(
+        seed_logins_and_api_calls(cid, plan, starts) for cid, plan in plans
+    )
+
+    # One bulk load per table
+    loads = [
+        (Event.__table__, EVENT_COLUMNS, events),
+        (FeatureUsage.__table__, FEATURE_USAGE_COLUMNS, usage),
+        (SupportTicket.__table__, TICKET_COLUMNS, tickets),
+        (Invoice.__table__, INVOICE_COLUMNS, invoices),
+    ]
+    workers = seed_worker_count(len(loads))
+    if in_db:
+        seed_events_in_db(session, plans, now)
+    if workers == 1:
+        # Serial: customers and every child table in a single transaction / commit
+        for table, columns, rows in loads:
+            load_rows(session, table, columns, rows)
         session.commit()
+    else:
+        # Worker connections must see the customers (FKs): commit them first, then
+        # each table load commits on its own connection
+        session.commit()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # list() re-raises the first worker failure here
+                list(pool.map(lambda job: _load_table(*job), loads))
+        except BaseException:
+            # Every worker has finished: remove this run's customers and whatever
+            # the other tables committed, then fail
+            print("Seeding failed; removing this run's partial data ...")
+            discard_customers([cid for cid, _ in plans])
+            raise
 
 def main() -> None:
     """
@@ -281,12 +611,16 @@ def main() -> None:
     Steps:
       1) Optional RNG seeding for reproducibility.
       2) Reset or ensure tables exist.
-      3) Skip if DB already populated (unless --reset).
-      4) Create customers, then generate:
+      3) Skip if DB already populated (unless --reset). With --fast-seed, drop the
+         child tables' secondary indexes (rebuilt after the load, even on failure).
+      4) Create customers, then generate (for all customers):
          - 90d events (logins, API with trend),
          - feature usage,
          - support tickets,
-         - ~4 invoice cycles/customer.
+         - ~4 invoice cycles/customer,
+         and bulk-load each table once (COPY on Postgres), up to
+         MAX_SEED_THREADS tables at a time. With --in-db, events are
+         generated by Postgres itself (seed_events_in_db).
       5) Print a concise summary.
 
     Exit codes:
@@ -294,7 +628,7 @@ def main() -> None:
     """
     args = parse_args()
     if args.seed is not None:
-        random.seed(args.seed); Faker.seed(args.seed)
+        random.seed(args.seed); np.random.seed(args.seed); Faker.seed(args.seed)
 
     if args.reset:
         print("⚠️  Dropping & recreating tables ..."); reset_db()
@@ -308,25 +642,36 @@ def main() -> None:
         print(f"DB already has {existing} customers; use --reset to reseed.")
         session.close(); return
 
+    in_db = args.in_db and engine.dialect.name == "postgresql"
+    if args.in_db and not in_db:
+        print("--in-db needs Postgres; generating events in Python instead.")
+    if args.fast_seed:
+        print("Dropping child-table indexes for the bulk load ...")
+        drop_bulk_indexes()
+
     target = max(50, int(args.customers))  # 50+ customers
-    print(f"Creating {target} customers with segment-aware personas...")
-    customers = seed_customers(session, target)
-
-    print("Generating 90d activity + 4 invoices per customer...")
-    for c in customers:
-        label, persona = choose_persona(c.segment)
-        seed_logins_and_api_calls(session, c.id, persona)
-        seed_feature_usage(session, c.id, persona)
-        seed_support_tickets(session, c.id, persona)
-        seed_invoices(session, c.id, persona)
-
-    # Summary
-    ev   = session.query(Event).count()
-    inv  = session.query(Invoice).count()
-    tic  = session.query(SupportTicket).count()
-    feat = session.query(FeatureUsage).count()
+    # One clock reading for the whole run
+    now = utcnow()
+    try:
+        print(f"Creating {target} customers with segment-aware personas...")
+        customers = seed_customers(session, target, now)
+        print("Generating 90d activity + 4 invoices per customer...")
+        load_activity(session, customers, now, in_db)
+    except BaseException:
+        session.rollback()  # release the write transaction before index DDL
+        raise
+    finally:
+        if args.fast_seed:
+            print("Rebuilding indexes ...")
+            create_missing_indexes()
+
+    # Summary: every table count in one round trip
+    cust, ev, inv, tic, feat = session.execute(select(*(
+        select(func.count()).select_from(model).scalar_subquery()
+        for model in (Customer, Event, Invoice, SupportTicket, FeatureUsage)
+    ))).one()
     print("\n✅ Seed complete")
-    print(f"Customers:       {target}")
+    print(f"Customers:       {cust}")
     print(f"Events:          {ev} (login/api_call)")
     print(f"Invoices:        {inv}")
     print(f"Support tickets: {tic}")